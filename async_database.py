@@ -0,0 +1,127 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+
+from database import database_class
+
+
+class AsyncDatabase:
+    # asyncio facade over Database. All file I/O runs on a bounded thread pool;
+    # a thread lock guards the shared file handle, an asyncio lock keeps writes
+    # in submission order, and concurrent get_by_id calls issued in the same
+    # loop tick are coalesced into a single get_many pass sorted by offset.
+    def __init__(self, filepath, max_workers=2, iterate_batch=256, db=None):
+        self.db = db if db is not None else database_class(filepath)(filepath)
+        self.iterate_batch = iterate_batch
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ufc-db-io')
+        self._io_lock = threading.Lock()
+        self._write_lock = asyncio.Lock()
+        self._pending_gets = {}
+        self._gets_scheduled = False
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _locked(self, fn, *args, **kwargs):
+        with self._io_lock:
+            return fn(*args, **kwargs)
+
+    async def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(self._locked, fn, *args, **kwargs))
+
+    async def _write(self, fn, *args, **kwargs):
+        async with self._write_lock:
+            return await self._run(fn, *args, **kwargs)
+
+    async def create(self, overwrite=False):
+        return await self._write(self.db.create, overwrite)
+
+    async def open(self):
+        return await self._write(self.db.open)
+
+    async def close(self):
+        try:
+            await self._write(self.db.close)
+        finally:
+            self._executor.shutdown(wait=True)
+
+    async def save(self):
+        return await self._write(self.db.save)
+
+    async def add(self, record):
+        return await self._write(self.db.add, record)
+
+    async def edit(self, id_, **kwargs):
+        return await self._write(self.db.edit, id_, **kwargs)
+
+    async def delete_by_id(self, id_):
+        return await self._write(self.db.delete_by_id, id_)
+
+    async def delete_by_field(self, field, value):
+        return await self._write(self.db.delete_by_field, field, value)
+
+    async def import_json(self, json_path, id_field='id'):
+        return await self._write(self.db.import_json, json_path, id_field)
+
+    async def export_excel(self, excel_path, id_col='id'):
+        return await self._write(self.db.export_excel, excel_path, id_col)
+
+    async def backup(self, backup_path):
+        return await self._write(self.db.backup, backup_path)
+
+    async def search(self, field, value):
+        return await self._run(self.db.search, field, value)
+
+    async def get_many(self, ids):
+        return await self._run(self.db.get_many, list(ids))
+
+    async def get_by_id(self, id_):
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._pending_gets.setdefault(id_, []).append(fut)
+        if not self._gets_scheduled:
+            self._gets_scheduled = True
+            loop.call_soon(self._flush_gets)
+        return await fut
+
+    def _flush_gets(self):
+        self._gets_scheduled = False
+        pending, self._pending_gets = self._pending_gets, {}
+        task = asyncio.ensure_future(self.get_many(pending.keys()))
+
+        def done(t):
+            exc = None if t.cancelled() else t.exception()
+            found = {} if t.cancelled() or exc else t.result()
+            for id_, futs in pending.items():
+                for fut in futs:
+                    if fut.done():
+                        continue
+                    if t.cancelled():
+                        fut.cancel()
+                    elif exc is not None:
+                        fut.set_exception(exc)
+                    else:
+                        fut.set_result(found.get(id_))
+
+        task.add_done_callback(done)
+
+    async def iterate(self):
+        # Records are pulled from the blocking generator in batches so the loop
+        # is never blocked for a whole file scan.
+        it = self.db.iterate()
+        try:
+            while True:
+                batch = await self._run(lambda: list(islice(it, self.iterate_batch)))
+                for rec in batch:
+                    yield rec
+                if len(batch) < self.iterate_batch:
+                    break
+        finally:
+            await self._run(it.close)
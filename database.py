@@ -4,36 +4,281 @@ import pickle
 import shutil
 import json
 import re
+import threading
+import csv
+import datetime
+import functools
+import time
+import unicodedata
+import warnings
+import weakref
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+if __name__ == '__main__':
+    # python -m database runs this file as __main__. Hand over to the CLI
+    # before anything is defined: it imports this file as `database`, so
+    # there is a single copy of every class and of DEFAULT_BLOCK_CACHE.
+    import sys
+    import db_cli
+    sys.exit(db_cli.main())
+
+try:
+    import lz4.frame as _lz4
+except ImportError:
+    _lz4 = None
 
 RECORD_FMT = '<I10s8s50s50s30s30s30s20s20sB'
 RECORD_SIZE = struct.calcsize(RECORD_FMT)
+SCAN_CHUNK_RECORDS = 256
+
+# Shared block cache (see BlockCache): aligned block size, default memory
+# budget and the largest read-ahead window, in blocks.
+BLOCK_SIZE = 1 << 20
+BLOCK_CACHE_BUDGET = 64 << 20
+MAX_READAHEAD_BLOCKS = 8
+
+# Files created by this version start with a fixed-size header so open() can
+# skip loading the index; files without the magic are read as legacy
+# header-less files starting at offset 0.
+HEADER_MAGIC = b'UFCFIGHT'
+HEADER_FMT = '<8sHHIIII'
+HEADER_SIZE = 64
+FORMAT_VERSION = 2
 
 def _encode(s, length):
-    b = str(s).encode('utf-8')[:length]
+    b = str(s).encode('utf-8')
+    if len(b) > length:
+        # Cut on a character boundary so the field always decodes back.
+        b = b[:length].decode('utf-8', 'ignore').encode('utf-8')
     return b.ljust(length, b'\x00')
 
 def _decode(bs):
     return bs.split(b'\x00', 1)[0].decode('utf-8')
 
+_NUMERIC_RE = re.compile(r"\d+")
+_MMSS_RE = re.compile(r"(\d{1,2}):(\d{2})")
+
 def _is_numeric_only(s: str):
-    return bool(re.fullmatch(r"\d+", s.strip())) if isinstance(s, str) and s.strip() else False
+    return bool(_NUMERIC_RE.fullmatch(s.strip())) if isinstance(s, str) and s.strip() else False
 
 def _validate_fight_time_mmss(s: str):
     if not isinstance(s, str):
         return False
-    m = re.fullmatch(r"(\d{1,2}):(\d{2})", s.strip())
+    m = _MMSS_RE.fullmatch(s.strip())
     if not m:
         return False
     seconds = int(m.group(2))
     return 0 <= seconds < 60
 
 
+FIELDS = ('id','date','fight_time','event','location','card_type','weight_class','fighter_1','fighter_2','winner')
+
 CARD_TYPES = ("Main Card", "Preliminary Card", "Early Prelims")
 WEIGHT_CLASSES = (
     "Flyweight","Bantamweight","Featherweight","Lightweight","Welterweight",
     "Middleweight","Light Heavyweight","Heavyweight",
     "Women's Strawweight","Women's Flyweight","Women's Bantamweight","Women's Featherweight"
 )
+_CARD_TYPES_SET = frozenset(CARD_TYPES)
+_WEIGHT_CLASSES_SET = frozenset(WEIGHT_CLASSES)
+
+VALIDATION_CHUNK = 5000
+
+def record_errors(rec):
+    # Every rule add/edit enforce, as (field, reason) pairs; empty when valid.
+    errors = []
+    for f in ('fighter_1', 'fighter_2', 'winner'):
+        if _is_numeric_only(getattr(rec, f)):
+            errors.append((f, 'Fighter names/winner must not be numeric-only strings'))
+    if not _validate_fight_time_mmss(rec.fight_time):
+        errors.append(('fight_time', 'fight_time must be in MM:SS format, seconds 00-59'))
+    if rec.card_type not in _CARD_TYPES_SET:
+        errors.append(('card_type', f'card_type must be one of {CARD_TYPES}'))
+    if rec.weight_class not in _WEIGHT_CLASSES_SET:
+        errors.append(('weight_class', f'weight_class must be one of {WEIGHT_CLASSES}'))
+    if rec.winner and not (rec.winner == rec.fighter_1 or rec.winner == rec.fighter_2):
+        errors.append(('winner', 'winner must be one of fighter_1 or fighter_2'))
+    return errors
+
+def _record_key(rec):
+    return tuple(getattr(rec, f) for f in FIELDS if f != 'id')
+
+def _validate(rec):
+    errors = record_errors(rec)
+    if errors:
+        raise ValueError(errors[0][1])
+
+def _validate_chunk(start, records):
+    report = []
+    for i, rec in enumerate(records, start):
+        for field, reason in record_errors(rec):
+            report.append({'row': i, 'field': field, 'reason': reason})
+    return report
+
+def validate_records(records, workers=None, chunk_size=VALIDATION_CHUNK):
+    # Validates a whole batch and returns [{'row', 'field', 'reason'}, ...]
+    # ordered by row. With workers > 1 large batches are split across processes.
+    records = list(records)
+    if not workers or workers <= 1 or len(records) <= chunk_size:
+        return _validate_chunk(0, records)
+    starts = list(range(0, len(records), chunk_size))
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        chunks = ex.map(_validate_chunk, starts, [records[s:s + chunk_size] for s in starts])
+        return [e for chunk in chunks for e in chunk]
+
+IMPORT_CHUNK = 10000
+DATE_FORMATS = ('%Y-%m-%d', '%Y/%m/%d', '%Y.%m.%d', '%d.%m.%Y', '%d/%m/%Y', '%m/%d/%Y',
+                '%Y%m%d', '%d %b %Y', '%d %B %Y', '%b %d, %Y', '%B %d, %Y')
+# When both are allowed, the order is inferred once per import from the date
+# column (see _settle_day_month); if nothing settles it, a slash date that
+# parses to two different days (e.g. 03/12/2024) is rejected.
+_DAY_FIRST, _MONTH_FIRST = '%d/%m/%Y', '%m/%d/%Y'
+_SLASH_DATE_RE = re.compile(r"\s*(\d{1,2})/(\d{1,2})/\d{4}")
+COLUMN_ALIASES = {
+    'fighter1': 'fighter_1', 'fighter_a': 'fighter_1', 'red_corner': 'fighter_1',
+    'fighter2': 'fighter_2', 'fighter_b': 'fighter_2', 'blue_corner': 'fighter_2',
+    'time': 'fight_time', 'duration': 'fight_time', 'division': 'weight_class',
+    'weight': 'weight_class', 'card': 'card_type', 'venue': 'location',
+}
+
+def _is_blank(v):
+    return v is None or v != v or (isinstance(v, str) and not v.strip())
+
+def _normalize_date(v, date_formats=DATE_FORMATS):
+    if _is_blank(v):
+        return '0000-00-00'
+    if isinstance(v, (datetime.date, datetime.datetime)):
+        return v.strftime('%Y-%m-%d')
+    return _parse_date_text(str(v).strip(), date_formats)
+
+_ISO_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+@functools.lru_cache(maxsize=65536)
+def _parse_date_text(s, date_formats):
+    # Cached: exports repeat the same few event dates thousands of times.
+    if _ISO_DATE_RE.fullmatch(s):
+        return s
+    for fmt in date_formats:
+        try:
+            d = datetime.datetime.strptime(s, fmt)
+        except ValueError:
+            continue
+        if fmt in (_DAY_FIRST, _MONTH_FIRST) and _DAY_FIRST in date_formats and _MONTH_FIRST in date_formats:
+            try:
+                other = datetime.datetime.strptime(s, _MONTH_FIRST if fmt == _DAY_FIRST else _DAY_FIRST)
+            except ValueError:
+                other = d
+            if other != d:
+                raise ValueError(f'ambiguous date {s!r} (day/month order unknown); pass date_formats with one order')
+        return d.strftime('%Y-%m-%d')
+    if len(s) > 10 and s[10] in 'T ':
+        return _parse_date_text(s[:10], date_formats)
+    return s
+
+def _settle_day_month(values, date_formats):
+    # One file comes from one export, so its slash dates share an order: the
+    # first value with a part above 12 decides it for the whole column.
+    date_formats = tuple(date_formats)
+    if _DAY_FIRST not in date_formats or _MONTH_FIRST not in date_formats:
+        return date_formats
+    for v in values:
+        m = _SLASH_DATE_RE.match(v) if isinstance(v, str) else None
+        if m is None:
+            continue
+        if int(m.group(1)) > 12:
+            return tuple(f for f in date_formats if f != _MONTH_FIRST)
+        if int(m.group(2)) > 12:
+            return tuple(f for f in date_formats if f != _DAY_FIRST)
+    return date_formats
+
+def _date_values(rows, mapping):
+    cols = [i for i, field in enumerate(mapping) if field == 'date']
+    for values in rows:
+        for i in cols:
+            if i < len(values):
+                yield values[i]
+
+def _normalize_fight_time(v):
+    # Accepts M:SS, H:MM:SS, plain seconds and time/timedelta values from
+    # spreadsheets; returns MM:SS or the original text for validation to reject.
+    if _is_blank(v):
+        return '00:00'
+    if isinstance(v, datetime.time):
+        total = v.hour * 3600 + v.minute * 60 + v.second
+    elif isinstance(v, datetime.timedelta):
+        total = int(v.total_seconds())
+    elif isinstance(v, (int, float)):
+        total = int(v)
+    else:
+        s = str(v).strip()
+        parts = s.split(':')
+        if not all(p.isdigit() for p in parts) or len(parts) > 3:
+            return s
+        nums = [int(p) for p in parts]
+        if len(parts) == 1:
+            total = nums[0]
+        elif len(parts) == 2:
+            if nums[1] >= 60:
+                return s
+            total = nums[0] * 60 + nums[1]
+        else:
+            total = nums[0] * 3600 + nums[1] * 60 + nums[2]
+    return '%02d:%02d' % (total // 60, total % 60)
+
+def _map_columns(headers, columns=None):
+    # Position -> Record field (or None to skip the column).
+    mapping = []
+    for h in headers:
+        h = '' if h is None else str(h)
+        if columns is not None:
+            mapping.append(columns.get(h))
+            continue
+        key = h.strip().lower().replace(' ', '_').replace('-', '_')
+        key = COLUMN_ALIASES.get(key, key)
+        mapping.append(key if key in FIELDS else None)
+    return mapping
+
+def _rows_to_records(start, rows, mapping, date_formats=DATE_FORMATS):
+    # Builds, normalizes and validates one chunk of raw rows. Module level so
+    # it can run in worker processes. Returns ([(row, Record)], errors).
+    pairs, report = [], []
+    for row, values in enumerate(rows, start):
+        item = {}
+        for field, v in zip(mapping, values):
+            if field is not None:
+                item[field] = v
+        try:
+            item['date'] = _normalize_date(item.get('date'), date_formats)
+            item['fight_time'] = _normalize_fight_time(item.get('fight_time'))
+            for f in FIELDS[3:]:
+                v = item.get(f)
+                if _is_blank(v):
+                    item.pop(f, None)
+                else:
+                    item[f] = str(v).strip()
+            item.pop('id', None)
+            rec = Record.from_dict(item)
+        except Exception as e:
+            report.append({'row': row, 'field': None, 'reason': str(e)})
+            continue
+        errors = record_errors(rec)
+        for field, reason in errors:
+            report.append({'row': row, 'field': field, 'reason': reason})
+        if not errors:
+            pairs.append((row, rec))
+    return pairs, report
+
+def _chunks(rows, size):
+    chunk = []
+    for r in rows:
+        chunk.append(r)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
 
 class Record:
     __slots__ = ('id','date','fight_time','event','location','card_type','weight_class','fighter_1','fighter_2','winner','active')
@@ -66,6 +311,30 @@ class Record:
                            _encode(self.weight_class,20),
                            self.active)
 
+    def __reduce__(self):
+        # Compact pickling for records passed to/from worker processes.
+        return (Record, (self.id, self.date, self.fight_time, self.event, self.location,
+                         self.card_type, self.weight_class, self.fighter_1, self.fighter_2,
+                         self.winner, self.active))
+
+    def to_dict(self):
+        return {f: getattr(self, f) for f in FIELDS}
+
+    @classmethod
+    def from_dict(cls, item, id_field='id'):
+        return cls(
+            int(item.get(id_field, 0) or 0),
+            item.get('date','0000-00-00'),
+            item.get('fight_time','00:00'),
+            item.get('event',''),
+            item.get('location',''),
+            item.get('card_type', CARD_TYPES[0]),
+            item.get('weight_class', WEIGHT_CLASSES[0]),
+            item.get('fighter_1',''),
+            item.get('fighter_2',''),
+            item.get('winner','')
+        )
+
     @classmethod
     def unpack(cls, bs):
         vals = struct.unpack(RECORD_FMT, bs)
@@ -83,29 +352,714 @@ class Record:
             vals[10]
         )
 
+# Field order inside RECORD_FMT (after id, before the active flag).
+PACKED_FIELDS = ('date','fight_time','event','location','fighter_1','fighter_2','winner','card_type','weight_class')
+VERIFY_CHUNK_RECORDS = 65536
+
+def _inspect_raw(offset, bs, problems):
+    # Checks one raw record without decoding it into a Record. Returns
+    # (offset, id, active, key) where key identifies the field contents.
+    vals = struct.unpack(RECORD_FMT, bs)
+    id_, active = vals[0], vals[10]
+    if active not in (0, 1):
+        problems.append({'kind': 'bad_active_flag', 'offset': offset, 'id': id_, 'detail': f'active={active}'})
+    bad = []
+    for name, raw in zip(PACKED_FIELDS, vals[1:10]):
+        try:
+            raw.split(b'\x00', 1)[0].decode('utf-8')
+        except UnicodeDecodeError:
+            bad.append(name)
+    if bad:
+        problems.append({'kind': 'bad_utf8', 'offset': offset, 'id': id_, 'detail': ','.join(bad)})
+    return offset, id_, active, tuple(v.split(b'\x00', 1)[0] for v in vals[1:10])
+
+def _verify_chunk(path, start, end):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    entries, problems = [], []
+    for pos in range(0, len(data) - RECORD_SIZE + 1, RECORD_SIZE):
+        entries.append(_inspect_raw(start + pos, data[pos:pos + RECORD_SIZE], problems))
+    return entries, problems
+
+def _repair_raw(bs):
+    # Rebuilds a record whose fields were cut mid-character or whose active
+    # flag is garbage; undecodable bytes are dropped. A garbage flag says
+    # nothing about whether the record was live, so it comes back deleted.
+    vals = list(struct.unpack(RECORD_FMT, bs))
+    for i in range(1, 10):
+        vals[i] = vals[i].split(b'\x00', 1)[0].decode('utf-8', 'ignore')
+    return Record(vals[0], vals[1], vals[2], vals[3], vals[4], vals[8], vals[9],
+                  vals[5], vals[6], vals[7], 1 if vals[10] == 1 else 0)
+
+def read_changes(changespath, since=0):
+    # Events from a persisted change log with seq > since. A consumer stores
+    # the last seq it processed and passes it back as the resume cursor.
+    if not os.path.exists(changespath):
+        return
+    with open(changespath, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.endswith('\n'):
+                break
+            event = json.loads(line)
+            if event['seq'] > since:
+                yield event
+
+def follow_changes(changespath, since=0, poll_interval=0.5):
+    # Like read_changes, but keeps waiting for new events (tail -f). The file
+    # position is kept between polls so each poll reads only what was
+    # appended; seq only skips seen events when the log is (re)opened, e.g.
+    # after a restart or when the file was deleted and recreated.
+    f, ident, partial = None, None, b''
+    try:
+        while True:
+            try:
+                st = os.stat(changespath)
+            except FileNotFoundError:
+                st = None
+            if f is not None and (st is None or (st.st_dev, st.st_ino) != ident or st.st_size < f.tell()):
+                f.close()
+                f = None
+            if f is None and st is not None:
+                f = open(changespath, 'rb')
+                ident, partial = (st.st_dev, st.st_ino), b''
+            if f is not None:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        partial += line  # still being written; finish it next poll
+                        break
+                    line, partial = partial + line, b''
+                    event = json.loads(line)
+                    if event['seq'] > since:
+                        since = event['seq']
+                        yield event
+            time.sleep(poll_interval)
+    finally:
+        if f is not None:
+            f.close()
+
+def _last_logged_seq(changespath):
+    if not os.path.exists(changespath):
+        return 0
+    with open(changespath, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        start = max(0, f.tell() - 65536)
+        f.seek(start)
+        lines = f.read().split(b'\n')
+        if start:
+            lines = lines[1:]  # the read began mid-line
+        lines = [l for l in lines if l.strip()]
+    for line in reversed(lines):
+        try:
+            return json.loads(line)['seq']
+        except (ValueError, KeyError):
+            continue
+    return 0
+
+def _write_excel(records, excel_path):
+    try:
+        import pandas as pd
+    except ImportError:
+        raise RuntimeError('pandas is required to export to excel')
+    rows = [r.to_dict() for r in records]
+    df = pd.DataFrame(rows)
+    df.to_excel(excel_path, index=False)
+    return len(rows)
+
+class BlockCache:
+    # LRU cache of aligned file blocks shared by every Database in the process,
+    # keyed by (path, block number). A miss right after the previous block of
+    # the same file counts as sequential and also reads the next blocks in the
+    # same call; the window doubles on each sequential miss up to
+    # max_readahead and drops back to none on a random access.
+    def __init__(self, block_size=BLOCK_SIZE, budget=BLOCK_CACHE_BUDGET, max_readahead=MAX_READAHEAD_BLOCKS):
+        if block_size <= 0 or budget < 0:
+            raise ValueError('block_size must be positive and budget non-negative')
+        self.block_size = block_size
+        self.budget = budget
+        self.max_readahead = max_readahead
+        self._blocks = OrderedDict()
+        self._bytes = 0
+        self._files = {}  # key -> [last block read, read-ahead window, generation, stat signature]
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.prefetched = self.prefetch_hits = self.evictions = 0
+        self._unused_prefetch = set()
+
+    def _file(self, key):
+        st = self._files.get(key)
+        if st is None:
+            st = self._files[key] = [-2, 0, 0, None]
+        return st
+
+    def read(self, f, key, start, length):
+        if length <= 0:
+            return b''
+        bs = self.block_size
+        end = start + length
+        parts = []
+        for block_no in range(start // bs, (end - 1) // bs + 1):
+            data = self._get(f, key, block_no)
+            base = block_no * bs
+            parts.append(data[max(start - base, 0):end - base])
+            if len(data) < bs:
+                break
+        return parts[0] if len(parts) == 1 else b''.join(parts)
+
+    def _get(self, f, key, block_no):
+        with self._lock:
+            data = self._blocks.get((key, block_no))
+            st = self._file(key)
+            if data is not None:
+                self._blocks.move_to_end((key, block_no))
+                self.hits += 1
+                if (key, block_no) in self._unused_prefetch:
+                    self._unused_prefetch.discard((key, block_no))
+                    self.prefetch_hits += 1
+                st[0] = block_no
+                return data
+            self.misses += 1
+            if block_no == st[0] + 1:
+                st[1] = min(self.max_readahead, max(1, st[1] * 2))
+            else:
+                st[1] = 0
+            st[0] = block_no
+            # Never read ahead more than the budget can hold next to this block.
+            ahead, gen = min(st[1], max(0, self.budget // self.block_size - 1)), st[2]
+        # The read happens outside the lock; the generation check below keeps a
+        # write that raced with it from being masked by stale data.
+        f.seek(block_no * self.block_size)
+        buf = f.read(self.block_size * (1 + ahead))
+        blocks = [buf[i:i + self.block_size] for i in range(0, len(buf), self.block_size)]
+        with self._lock:
+            if self._file(key)[2] == gen:
+                for i, data in enumerate(blocks):
+                    if (key, block_no + i) in self._blocks:
+                        continue
+                    self._put((key, block_no + i), data)
+                    if i:
+                        self.prefetched += 1
+                        self._unused_prefetch.add((key, block_no + i))
+                self._evict()
+        return blocks[0] if blocks else b''
+
+    def _put(self, k, data):
+        self._blocks[k] = data
+        self._bytes += len(data)
+
+    def _drop(self, k):
+        data = self._blocks.pop(k, None)
+        if data is not None:
+            self._bytes -= len(data)
+            self._unused_prefetch.discard(k)
+
+    def _evict(self):
+        while self._bytes > self.budget and self._blocks:
+            k, data = self._blocks.popitem(last=False)
+            self._bytes -= len(data)
+            self._unused_prefetch.discard(k)
+            self.evictions += 1
+
+    def write(self, key, start, data):
+        # Write-through: cached blocks covering the range are patched in place
+        # (a block the write would extend is dropped instead).
+        if not data:
+            return
+        bs = self.block_size
+        end = start + len(data)
+        with self._lock:
+            self._file(key)[2] += 1
+            for block_no in range(start // bs, (end - 1) // bs + 1):
+                k = (key, block_no)
+                old = self._blocks.get(k)
+                if old is None:
+                    continue
+                base = block_no * bs
+                lo, hi = max(start, base), min(end, base + bs)
+                if hi - base > len(old):
+                    self._drop(k)
+                    continue
+                self._blocks[k] = old[:lo - base] + data[lo - start:hi - start] + old[hi - base:]
+
+    def invalidate(self, key, start=0, length=None):
+        with self._lock:
+            self._file(key)[2] += 1
+            if length is None:
+                for k in [k for k in self._blocks if k[0] == key and (k[1] + 1) * self.block_size > start]:
+                    self._drop(k)
+                return
+            for block_no in range(start // self.block_size, (start + max(length, 1) - 1) // self.block_size + 1):
+                self._drop((key, block_no))
+
+    def drop_file(self, key):
+        self.invalidate(key)
+        with self._lock:
+            st = self._file(key)
+            st[0], st[1], st[3] = -2, 0, None
+
+    def validate(self, key, signature):
+        # Called on open with the file's (size, mtime): a file changed behind
+        # our back (another process, a copy) loses its cached blocks.
+        with self._lock:
+            st = self._file(key)
+            stale = st[3] is not None and st[3] != signature
+            st[3] = signature
+        if stale:
+            self.invalidate(key)
+
+    def touch(self, key, signature):
+        # Our own writes move the signature too; record it so the next
+        # validate() only reacts to changes made outside this process.
+        with self._lock:
+            self._file(key)[3] = signature
+
+    def resize(self, budget):
+        if budget < 0:
+            raise ValueError('budget must be non-negative')
+        with self._lock:
+            self.budget = budget
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            for st in self._files.values():
+                st[2] += 1
+            self._blocks.clear()
+            self._unused_prefetch.clear()
+            self._bytes = 0
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = self.prefetched = self.prefetch_hits = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'block_size': self.block_size,
+                'budget': self.budget,
+                'bytes': self._bytes,
+                'blocks': len(self._blocks),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'prefetched': self.prefetched,
+                'prefetch_hits': self.prefetch_hits,
+                'evictions': self.evictions,
+            }
+
+DEFAULT_BLOCK_CACHE = BlockCache()
+
+class Snapshot:
+    def __init__(self, db):
+        if db.file is None:
+            db.open()
+        self.db = db
+        self.index = dict(db.index)
+        self.end = db._end_offset()
+        self.preimages = {}
+        self.valid = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.db._snapshots.discard(self)
+        self.preimages = {}
+        self.valid = False
+
+    def _check(self):
+        if not self.valid:
+            raise RuntimeError('snapshot is closed or was invalidated by clear/restore/delete')
+
+    def count(self):
+        return len(self.index)
+
+    def get_by_id(self, id_):
+        self._check()
+        if id_ not in self.index:
+            return None
+        offset = self.index[id_]
+        bs = self.preimages.get(offset) or self.db._read_raw(offset)
+        rec = Record.unpack(bs) if bs else None
+        return rec if rec and rec.active else None
+
+    def iterate(self):
+        self._check()
+        for offset, rec in self.db._scan():
+            if offset >= self.end:
+                break
+            self._check()
+            if offset in self.preimages:
+                rec = Record.unpack(self.preimages[offset])
+            if rec.active:
+                yield rec
+
+    def search(self, field, value):
+        if field == 'id':
+            try:
+                rec = self.get_by_id(int(value))
+            except Exception:
+                return []
+            return [rec] if rec else []
+        return [r for r in self.iterate() if getattr(r, field) == value]
+
+    def export_excel(self, excel_path, id_col='id'):
+        return _write_excel(self.iterate(), excel_path)
+
+FIGHTER_FIELDS = ('fighter_1', 'fighter_2', 'winner')
+
+def normalize_name(name):
+    # Case-, accent- and whitespace-insensitive key for fighter names.
+    s = unicodedata.normalize('NFKD', str(name or ''))
+    s = ''.join(c for c in s if not unicodedata.combining(c))
+    return ' '.join(s.casefold().split())
+
+def _fight_seconds(fight_time):
+    m = _MMSS_RE.fullmatch(fight_time.strip()) if isinstance(fight_time, str) else None
+    return int(m.group(1)) * 60 + int(m.group(2)) if m else 0
+
+class FighterIndex:
+    # Maps each normalized fighter name to the ids of their fights, whichever
+    # corner they were in, with running win/loss/fight-time totals. Built with
+    # one scan, then kept current from the database change events.
+    def __init__(self, db):
+        self.db = db
+        self.fights = {}
+        self.by_name = {}
+        self.stats = {}
+        self.stray_winners = set()  # ids whose winner is neither corner
+        self.stale = False
+        self.rebuild()
+        db.subscribe(self._on_change)
+
+    def rebuild(self):
+        self.fights, self.by_name, self.stats, self.stray_winners = {}, {}, {}, set()
+        self.stale = False
+        for rec in self.db.iterate():
+            self._add(rec.id, rec.fighter_1, rec.fighter_2, rec.winner, rec.fight_time)
+
+    def _stat(self, key):
+        st = self.stats.get(key)
+        if st is None:
+            st = self.stats[key] = {'fights': 0, 'wins': 0, 'losses': 0, 'no_result': 0, 'fight_seconds': 0}
+        return st
+
+    def _add(self, id_, fighter_1, fighter_2, winner, fight_time):
+        f1, f2, w = normalize_name(fighter_1), normalize_name(fighter_2), normalize_name(winner)
+        secs = _fight_seconds(fight_time)
+        self.fights[id_] = (f1, f2, w, secs)
+        if w and w not in (f1, f2):
+            self.stray_winners.add(id_)
+        for key in set(k for k in (f1, f2) if k):
+            self.by_name.setdefault(key, set()).add(id_)
+            st = self._stat(key)
+            st['fights'] += 1
+            st['fight_seconds'] += secs
+            if not w:
+                st['no_result'] += 1
+            elif w == key:
+                st['wins'] += 1
+            else:
+                st['losses'] += 1
+
+    def _remove(self, id_):
+        entry = self.fights.pop(id_, None)
+        if entry is None:
+            return
+        f1, f2, w, secs = entry
+        self.stray_winners.discard(id_)
+        for key in set(k for k in (f1, f2) if k):
+            ids = self.by_name.get(key)
+            if ids is not None:
+                ids.discard(id_)
+                if not ids:
+                    del self.by_name[key]
+            st = self._stat(key)
+            st['fights'] -= 1
+            st['fight_seconds'] -= secs
+            if not w:
+                st['no_result'] -= 1
+            elif w == key:
+                st['wins'] -= 1
+            else:
+                st['losses'] -= 1
+            if st['fights'] <= 0:
+                del self.stats[key]
+
+    def _renumber(self, pairs):
+        moved = [(old, new, self.fights.pop(old)) for old, new in pairs if old in self.fights]
+        stray = set(old for old, _, _ in moved if old in self.stray_winners)
+        for old, new, entry in moved:
+            self.stray_winners.discard(old)
+            for key in set(k for k in entry[:2] if k):
+                self.by_name[key].discard(old)
+        for old, new, entry in moved:
+            self.fights[new] = entry
+            if old in stray:
+                self.stray_winners.add(new)
+            for key in set(k for k in entry[:2] if k):
+                self.by_name[key].add(new)
+
+    def _on_change(self, event):
+        # An event that cannot be applied leaves the index out of sync, so it
+        # is marked stale and rebuilt by one scan on the next lookup.
+        if self.stale:
+            return
+        try:
+            self._apply(event)
+        except Exception:
+            self.stale = True
+            raise
+
+    def _current(self):
+        if self.stale:
+            self.rebuild()
+        return self
+
+    def _apply(self, event):
+        op = event['op']
+        if op == 'add':
+            r = event['record']
+            self._add(event['id'], r['fighter_1'], r['fighter_2'], r['winner'], r['fight_time'])
+        elif op == 'edit':
+            r = event['record']
+            self._remove(event['id'])
+            self._add(event['id'], r['fighter_1'], r['fighter_2'], r['winner'], r['fight_time'])
+        elif op == 'delete':
+            self._remove(event['id'])
+        elif op == 'renumber':
+            self._renumber(event['ids'])
+        elif op in ('clear', 'restore'):
+            self.rebuild()
+
+    def ids_of(self, name):
+        self._current()
+        return sorted(self.by_name.get(normalize_name(name), ()))
+
+    def candidates(self, field, value):
+        # Ids that may hold value in field (a superset, callers still compare
+        # exactly), or None when the index cannot prove it covers every match:
+        # blank names are not indexed, so those need a scan.
+        key = normalize_name(value)
+        if not key:
+            return None
+        self._current()
+        ids = self.by_name.get(key, set())
+        if field == 'winner':
+            ids = ids | self.stray_winners
+        return sorted(ids)
+
+    def fights_of(self, name):
+        found = self.db.get_many(self.ids_of(name))
+        return [found[i] for i in sorted(found)]
+
+    def head_to_head(self, a, b):
+        ka, kb = normalize_name(a), normalize_name(b)
+        self._current()
+        ids = self.by_name.get(ka, set()) & self.by_name.get(kb, set())
+        found = self.db.get_many(ids)
+        return [found[i] for i in sorted(found)]
+
+    def fighter_stats(self, name):
+        st = self._current().stats.get(normalize_name(name))
+        return dict(st) if st else {'fights': 0, 'wins': 0, 'losses': 0, 'no_result': 0, 'fight_seconds': 0}
+
 class Database:
-    def __init__(self, filepath):
+    def __init__(self, filepath, changelog=False, block_cache=None):
+        # block_cache: None uses the process-wide DEFAULT_BLOCK_CACHE, False
+        # reads the file directly.
         self.filepath = filepath
         self.indexpath = filepath + '.idx'
+        self.changespath = filepath + '.changes'
+        self.changelog = changelog
         self.file = None
-        self.index = {}
+        self.header = None
+        self.data_start = 0
+        self._index = {}
+        self._seq = None
+        self._listeners = []
+        self._snapshots = weakref.WeakSet()
+        self._fighters = None
+        self.block_cache = DEFAULT_BLOCK_CACHE if block_cache is None else (block_cache or None)
+        self._cache_key = os.path.abspath(filepath)
+
+    @property
+    def fighters(self):
+        if self._fighters is None:
+            self._fighters = FighterIndex(self)
+        return self._fighters
+
+    def fights_of(self, name):
+        return self.fighters.fights_of(name)
+
+    def head_to_head(self, a, b):
+        return self.fighters.head_to_head(a, b)
+
+    def fighter_stats(self, name):
+        return self.fighters.fighter_stats(name)
+
+    def snapshot(self):
+        # Point-in-time read view. It pins a copy of the index and the current
+        # end of file; later in-place writes save the old record bytes into
+        # every open snapshot first (copy-on-write per record), so writers
+        # never wait and snapshot reads stay consistent.
+        snap = Snapshot(self)
+        self._snapshots.add(snap)
+        return snap
+
+    def _preserve(self, offset):
+        if not self._snapshots:
+            return
+        old = None
+        for snap in list(self._snapshots):
+            if offset < snap.end and offset not in snap.preimages:
+                if old is None:
+                    old = self._read_raw(offset)
+                snap.preimages[offset] = old
+
+    def _invalidate_snapshots(self):
+        for snap in list(self._snapshots):
+            snap.valid = False
+        self._snapshots = weakref.WeakSet()
+
+    def subscribe(self, listener):
+        # listener(event) is called after every committed add/edit/delete with
+        # {'seq', 'op', 'ts', ...}; a 'renumber' event lists [old_id, new_id]
+        # pairs when deletes shift ids.
+        self._listeners.append(listener)
+        return listener
+
+    def unsubscribe(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    @property
+    def seq(self):
+        if self._seq is None:
+            self._seq = _last_logged_seq(self.changespath) if self.changelog else 0
+        return self._seq
+
+    def changes(self, since=0):
+        return read_changes(self.changespath, since)
+
+    def _emit(self, op, **data):
+        if not self._listeners and not self.changelog:
+            return
+        self._seq = self.seq + 1
+        event = {'seq': self._seq, 'op': op, 'ts': time.time()}
+        event.update(data)
+        if self.changelog:
+            with open(self.changespath, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(event, ensure_ascii=False) + '\n')
+        for listener in list(self._listeners):
+            # The change is already committed, so a failing listener must not
+            # fail the write; it is reported instead of silently dropped.
+            try:
+                listener(event)
+            except Exception as e:
+                warnings.warn(f'change listener {listener!r} failed on {op!r} event: {e!r}', RuntimeWarning)
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._load_index()
+        return self._index
+
+    @index.setter
+    def index(self, value):
+        self._index = value
 
     def create(self, overwrite=False):
         if os.path.exists(self.filepath) and not overwrite:
             raise FileExistsError('DB file already exists')
-        open(self.filepath, 'wb').close()
+        self._init_file()
         self.index = {}
         self._save_index()
 
+    def _init_file(self):
+        with open(self.filepath, 'wb') as f:
+            f.write(struct.pack(HEADER_FMT, HEADER_MAGIC, FORMAT_VERSION, HEADER_SIZE, 0, 0, 0, 0).ljust(HEADER_SIZE, b'\x00'))
+        self.header = None
+        self.data_start = HEADER_SIZE
+        self._drop_cached()
+
     def open(self):
+        # O(1): only the header is read; the index is loaded on first use.
         if not os.path.exists(self.filepath):
             raise FileNotFoundError('DB file not found')
         self.file = open(self.filepath, 'r+b')
+        self.file.seek(0)
+        if self.file.read(len(PAGE_FILE_MAGIC)) == PAGE_FILE_MAGIC:
+            # Paged files share the .bin extension but would be misread as
+            # header-less legacy records.
+            self.file.close(); self.file = None
+            raise ValueError('this is a paged database file, open it with PagedDatabase')
+        self.header = self._read_header(self.file)
+        self.data_start = self.header['header_size'] if self.header else 0
+        self._index = None
+        if self.block_cache:
+            st = os.fstat(self.file.fileno())
+            self.block_cache.validate(self._cache_key, (st.st_size, st.st_mtime_ns))
+
+    @staticmethod
+    def _read_header(f):
+        f.seek(0)
+        bs = f.read(HEADER_SIZE)
+        if len(bs) < HEADER_SIZE or not bs.startswith(HEADER_MAGIC):
+            return None
+        magic, version, header_size, record_count, live_count, max_id, index_crc = struct.unpack_from(HEADER_FMT, bs)
+        if version > FORMAT_VERSION:
+            raise ValueError(f'unsupported DB format version {version}')
+        return {'version': version, 'header_size': header_size, 'record_count': record_count,
+                'live_count': live_count, 'max_id': max_id, 'index_crc': index_crc}
+
+    def _write_header(self, index_crc):
+        if not self.data_start:
+            return
+        f = self.file if self.file else open(self.filepath, 'r+b')
+        try:
+            f.seek(0, os.SEEK_END)
+            record_count = (f.tell() - self.data_start) // RECORD_SIZE
+            max_id = max(self._index) if self._index else 0
+            self.header = {'version': FORMAT_VERSION, 'header_size': self.data_start, 'record_count': record_count,
+                           'live_count': len(self._index), 'max_id': max_id, 'index_crc': index_crc}
+            header = struct.pack(HEADER_FMT, HEADER_MAGIC, FORMAT_VERSION, self.data_start,
+                                 record_count, len(self._index), max_id, index_crc)
+            f.seek(0)
+            f.write(header)
+            f.flush()
+            self._cached_write(0, header)
+        finally:
+            if f is not self.file:
+                f.close()
+
+    def _load_index(self):
+        if self.file is None and os.path.exists(self.filepath):
+            self.open()
         if os.path.exists(self.indexpath):
             with open(self.indexpath, 'rb') as f:
-                self.index = pickle.load(f)
-        else:
-            self._rebuild_index()
+                data = f.read()
+            if self._index_is_current(data):
+                self._index = pickle.loads(data)
+                return
+        self._rebuild_index()
+
+    def _index_is_current(self, data):
+        # A crash between writing records and saving the index leaves the
+        # header's record count or index checksum out of date.
+        if self.header is None:
+            return True
+        size = os.path.getsize(self.filepath)
+        return (zlib.crc32(data) == self.header['index_crc'] and
+                size == self.data_start + self.header['record_count'] * RECORD_SIZE)
+
+    def count(self):
+        if self._index is None and self.header is not None:
+            return self.header['live_count']
+        return len(self.index)
 
     def close(self):
         if self.file:
@@ -116,21 +1070,28 @@ class Database:
             self.file.close()
             self.file = None
         self._save_index()
+        self._touch_cached()
 
     def delete(self):
+        self._invalidate_snapshots()
         if self.file:
             self.file.close(); self.file = None
         if os.path.exists(self.filepath): os.remove(self.filepath)
         if os.path.exists(self.indexpath): os.remove(self.indexpath)
+        if os.path.exists(self.changespath): os.remove(self.changespath)
+        self._drop_cached()
         self.index = {}
+        self._seq = None
 
     def clear(self):
+        self._invalidate_snapshots()
         if self.file:
             self.file.close(); self.file = None
-        open(self.filepath, 'wb').close()
+        self._init_file()
         self.index = {}
         self._save_index()
         self.open()
+        self._emit('clear')
 
     def save(self):
         self._save_index()
@@ -141,15 +1102,23 @@ class Database:
                 pass
 
     def _save_index(self):
+        if self._index is None:
+            return
+        data = pickle.dumps(self._index)
         with open(self.indexpath, 'wb') as f:
-            pickle.dump(self.index, f)
+            f.write(data)
+        crc = zlib.crc32(data)
+        self._write_header(crc)
+        return crc
 
     def _rebuild_index(self):
         self.index = {}
         if not os.path.exists(self.filepath):
             return
         with open(self.filepath, 'rb') as f:
-            offset = 0
+            header = self._read_header(f)
+            offset = self.data_start = header['header_size'] if header else 0
+            f.seek(offset)
             while True:
                 bs = f.read(RECORD_SIZE)
                 if not bs or len(bs) < RECORD_SIZE:
@@ -176,28 +1145,72 @@ class Database:
     def _find_duplicate(self, newrec: Record):
         if not os.path.exists(self.filepath):
             return False
-        open_mode = self.file is not None
-        if not open_mode:
-            f = open(self.filepath,'rb')
-            try:
-                while True:
-                    bs = f.read(RECORD_SIZE)
-                    if not bs or len(bs) < RECORD_SIZE: break
-                    rec = Record.unpack(bs)
-                    if rec.active and self._record_equals_except_id(rec, newrec):
-                        return True
-            finally:
-                f.close()
-            return False
-        else:
-            self.file.seek(0)
-            while True:
-                bs = self.file.read(RECORD_SIZE)
-                if not bs or len(bs) < RECORD_SIZE: break
-                rec = Record.unpack(bs)
-                if rec.active and self._record_equals_except_id(rec, newrec):
-                    return True
-            return False
+        for _, rec in self._scan():
+            if rec.active and self._record_equals_except_id(rec, newrec):
+                return True
+        return False
+
+    def _scan(self):
+        # Reads in chunks and re-seeks before each one, so other calls that move
+        # self.file between yields (writes, get_by_id) do not derail the scan.
+        if self.file is None:
+            self.open()
+        offset = self.data_start
+        while True:
+            chunk = self._read_range(offset, RECORD_SIZE * SCAN_CHUNK_RECORDS)
+            n = len(chunk) // RECORD_SIZE
+            for i in range(n):
+                yield offset, Record.unpack(chunk[i * RECORD_SIZE:(i + 1) * RECORD_SIZE])
+                offset += RECORD_SIZE
+            if n < SCAN_CHUNK_RECORDS:
+                break
+
+    def _write_at(self, offset, rec):
+        self._preserve(offset)
+        bs = rec.pack()
+        self.file.seek(offset)
+        self.file.write(bs)
+        self.file.flush()
+        self._cached_write(offset, bs)
+
+    def _write_many(self, items):
+        # Sorted by offset; runs of adjacent records go out as one write and
+        # the file is flushed once at the end.
+        items = sorted(items, key=lambda it: it[0])
+        i = 0
+        while i < len(items):
+            start = items[i][0]
+            buf = []
+            j = i
+            while j < len(items) and items[j][0] == start + (j - i) * RECORD_SIZE:
+                self._preserve(items[j][0])
+                buf.append(items[j][1].pack())
+                j += 1
+            data = b''.join(buf)
+            self.file.seek(start)
+            self.file.write(data)
+            self._cached_write(start, data)
+            i = j
+        if items:
+            self.file.flush()
+
+    def _append(self, rec):
+        self.file.seek(0, os.SEEK_END)
+        offset = self.file.tell()
+        bs = rec.pack()
+        self.file.write(bs)
+        self.file.flush()
+        self._cached_write(offset, bs)
+        return offset
+
+    def _append_many(self, recs):
+        self.file.seek(0, os.SEEK_END)
+        start = self.file.tell()
+        data = b''.join(rec.pack() for rec in recs)
+        self.file.write(data)
+        self.file.flush()
+        self._cached_write(start, data)
+        return [start + i * RECORD_SIZE for i in range(len(recs))]
 
     def _next_id(self):
         if not self.index:
@@ -214,25 +1227,24 @@ class Database:
             self.open()
             need_close = True
 
-        self.file.seek(0)
-        offset = 0
         next_id = 1
-        while True:
-            bs = self.file.read(RECORD_SIZE)
-            if not bs or len(bs) < RECORD_SIZE:
-                break
-            rec = Record.unpack(bs)
+        moved = []
+        writes = []
+        index = {}
+        for offset, rec in self._scan():
             if rec.active:
                 if rec.id != next_id:
+                    moved.append([rec.id, next_id])
                     rec.id = next_id
-                    self.file.seek(offset)
-                    self.file.write(rec.pack())
-                    self.file.flush()
-                self.index[rec.id] = offset
+                    writes.append((offset, rec))
+                index[rec.id] = offset
                 next_id += 1
-            offset += RECORD_SIZE
 
-        self._rebuild_index()
+        self._write_many(writes)
+        self.index = index
+        self._save_index()
+        if moved:
+            self._emit('renumber', ids=moved)
         if need_close:
             try:
                 self.file.close()
@@ -240,22 +1252,137 @@ class Database:
                 pass
             self.file = None
 
+    def verify(self, workers=None):
+        # Read-only consistency check. Returns {'records', 'active', 'problems'}
+        # where every problem is {'kind', 'offset', 'id', 'detail'}.
+        if self.file is None:
+            self.open()
+        self.file.flush()
+        entries, problems = self._verify_records(workers)
+        active = [e for e in entries if e[2] == 1]
+        by_id = {}
+        for offset, id_, _, _ in active:
+            if id_ in by_id:
+                problems.append({'kind': 'duplicate_id', 'offset': offset, 'id': id_,
+                                 'detail': f'also at offset {by_id[id_]}'})
+            else:
+                by_id[id_] = offset
+        if sorted(by_id) != list(range(1, len(by_id) + 1)):
+            problems.append({'kind': 'id_not_dense', 'offset': None, 'id': None,
+                             'detail': f'{len(by_id)} live ids, max id {max(by_id) if by_id else 0}'})
+        keys = {}
+        for offset, id_, _, key in active:
+            if key in keys:
+                problems.append({'kind': 'duplicate_record', 'offset': offset, 'id': id_,
+                                 'detail': f'same fields as id {keys[key]}'})
+            else:
+                keys[key] = id_
+        problems.extend(self._verify_index(by_id))
+        if self._fighters is not None and set(self._fighters.fights) != set(by_id):
+            problems.append({'kind': 'fighter_index_mismatch', 'offset': None, 'id': None,
+                             'detail': f'{len(self._fighters.fights)} indexed fights, {len(by_id)} live records'})
+        problems.sort(key=lambda p: (p['offset'] is None, p['offset'] or 0))
+        return {'records': len(entries), 'active': len(active), 'problems': problems}
+
+    def _verify_records(self, workers):
+        size = os.path.getsize(self.filepath)
+        start = self.data_start
+        end = start + (size - start) // RECORD_SIZE * RECORD_SIZE
+        problems = []
+        if end != size:
+            problems.append({'kind': 'trailing_bytes', 'offset': end, 'id': None,
+                             'detail': f'{size - end} bytes after the last full record'})
+        step = VERIFY_CHUNK_RECORDS * RECORD_SIZE
+        bounds = [(o, min(o + step, end)) for o in range(start, end, step)]
+        if workers and workers > 1 and len(bounds) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as ex:
+                results = list(ex.map(_verify_chunk, [self.filepath] * len(bounds),
+                                      [b[0] for b in bounds], [b[1] for b in bounds]))
+        else:
+            results = [_verify_chunk(self.filepath, a, b) for a, b in bounds]
+        entries = []
+        for chunk_entries, chunk_problems in results:
+            entries.extend(chunk_entries)
+            problems.extend(chunk_problems)
+        if self.header is not None:
+            live = sum(1 for e in entries if e[2] == 1)
+            if self.header['record_count'] != len(entries) or self.header['live_count'] != live:
+                problems.append({'kind': 'header_mismatch', 'offset': 0, 'id': None,
+                                 'detail': f"header says {self.header['record_count']}/{self.header['live_count']}, "
+                                           f'file has {len(entries)}/{live} records/live'})
+        return entries, problems
+
+    def _verify_index(self, by_id):
+        if not os.path.exists(self.indexpath):
+            return [{'kind': 'index_file_missing', 'offset': None, 'id': None, 'detail': self.indexpath}]
+        with open(self.indexpath, 'rb') as f:
+            data = f.read()
+        problems = []
+        if self.header is not None and zlib.crc32(data) != self.header['index_crc']:
+            problems.append({'kind': 'index_checksum', 'offset': None, 'id': None, 'detail': 'index file does not match header'})
+        try:
+            disk_index = pickle.loads(data)
+        except Exception as e:
+            return problems + [{'kind': 'index_unreadable', 'offset': None, 'id': None, 'detail': str(e)}]
+        for id_, offset in disk_index.items():
+            if by_id.get(id_) != offset:
+                problems.append({'kind': 'index_stale', 'offset': offset, 'id': id_,
+                                 'detail': f'live record with this id is at {by_id.get(id_)}'})
+        for id_, offset in by_id.items():
+            if id_ not in disk_index:
+                problems.append({'kind': 'index_missing', 'offset': offset, 'id': id_, 'detail': 'live record not in index'})
+        return problems
+
+    def repair(self, workers=None):
+        # Fixes what verify reports, in place: truncates a partial trailing
+        # record, rewrites records with broken UTF-8 or active flags, then
+        # renumbers ids densely and rebuilds the index, header and fighter
+        # index. Duplicate records are reported but kept. Returns the verify
+        # report taken after the repair.
+        report = self.verify(workers)
+        garbled = set(p['offset'] for p in report['problems'] if p['kind'] in ('bad_utf8', 'bad_active_flag'))
+        if report['records'] and len(garbled) * 2 > report['records']:
+            # Mostly unreadable records means a different file format, not
+            # corruption; "repairing" it would destroy the data.
+            raise ValueError(f'{len(garbled)} of {report["records"]} records are unreadable; '
+                             f'not a {type(self).__name__} file, refusing to repair')
+        if not self._layout_confirmed():
+            # Without a header nothing confirms the layout, so a partial
+            # trailing record or an active flag other than 0/1 is taken as a
+            # sign of a foreign file rather than something to fix.
+            odd = [p['kind'] for p in report['problems'] if p['kind'] in ('trailing_bytes', 'bad_active_flag')]
+            if odd:
+                raise ValueError(f'header-less file with {", ".join(sorted(set(odd)))}; '
+                                 f'not a {type(self).__name__} file, refusing to repair')
+        kinds = set(p['kind'] for p in report['problems'])
+        for p in report['problems']:
+            if p['kind'] == 'trailing_bytes':
+                self.file.truncate(p['offset'])
+                self.file.flush()
+                self._drop_cached()
+        fixes = {}
+        for p in report['problems']:
+            if p['kind'] in ('bad_utf8', 'bad_active_flag'):
+                fixes[p['offset']] = _repair_raw(self._read_raw(p['offset']))
+        self._write_many(list(fixes.items()))
+        if kinds - {'duplicate_record'}:
+            self._renumber_ids()
+            if self._fighters is not None:
+                self._fighters.rebuild()
+        return self.verify(workers)
+
+    def _layout_confirmed(self):
+        # True when a magic header vouches for the record layout.
+        return self.header is not None
+
     def add(self, record:Record):
-        
-        if _is_numeric_only(record.fighter_1) or _is_numeric_only(record.fighter_2) or _is_numeric_only(record.winner):
-            raise ValueError('Fighter names/winner must not be numeric-only strings')
-        if not _validate_fight_time_mmss(record.fight_time):
-            raise ValueError('fight_time must be in MM:SS format, seconds 00-59')
-        if record.card_type not in CARD_TYPES:
-            raise ValueError(f'card_type must be one of {CARD_TYPES}')
-        if record.weight_class not in WEIGHT_CLASSES:
-            raise ValueError(f'weight_class must be one of {WEIGHT_CLASSES}')
-        if record.winner and not (record.winner == record.fighter_1 or record.winner == record.fighter_2):
-            raise ValueError('winner must be one of fighter_1 or fighter_2')
+        _validate(record)
+        return self._insert(record)
 
+    def _insert(self, record:Record):
         if self.file is None:
             if not os.path.exists(self.filepath):
-                open(self.filepath,'wb').close()
+                self.create()
             self.open()
 
         assigned_id = self._next_id()
@@ -265,22 +1392,142 @@ class Database:
         if self._find_duplicate(record):
             raise ValueError('Duplicate record (identical fields except id)')
 
-        self.file.seek(0, os.SEEK_END)
-        offset = self.file.tell()
-        self.file.write(record.pack())
-        self.file.flush()
+        offset = self._append(record)
         self.index[record.id] = offset
         self._save_index()
+        self._emit('add', id=record.id, record=record.to_dict())
         return record.id
 
-    def _read_at(self, offset):
+    def add_many(self, records, errors=None, workers=None):
+        # Batched insert: one validation pass, one duplicate scan against a hash
+        # set, one append and one index save for the whole batch. Invalid or
+        # duplicate rows are skipped and reported in errors.
+        records = list(records)
+        report = errors if errors is not None else []
+        bad = set()
+        for e in validate_records(records, workers):
+            bad.add(e['row'])
+            report.append(e)
+        added = self._insert_many([(i, r) for i, r in enumerate(records) if i not in bad], report)
+        report.sort(key=lambda e: e['row'])
+        return added
+
+    def _insert_many(self, pairs, report):
         if self.file is None:
+            if not os.path.exists(self.filepath):
+                self.create()
             self.open()
-        self.file.seek(offset)
-        bs = self.file.read(RECORD_SIZE)
+        seen = set(_record_key(rec) for _, rec in self._scan() if rec.active)
+        next_id = self._next_id()
+        batch = []
+        for row, rec in pairs:
+            key = _record_key(rec)
+            if key in seen:
+                report.append({'row': row, 'field': None, 'reason': 'Duplicate record (identical fields except id)'})
+                continue
+            seen.add(key)
+            rec.id = next_id
+            next_id += 1
+            batch.append(rec)
+        if not batch:
+            return 0
+        for rec, offset in zip(batch, self._append_many(batch)):
+            self.index[rec.id] = offset
+        self._save_index()
+        for rec in batch:
+            self._emit('add', id=rec.id, record=rec.to_dict())
+        return len(batch)
+
+    def _import_rows(self, rows, mapping, errors, workers, chunk_size, date_formats):
+        date_formats = tuple(date_formats)  # hashable for the _parse_date_text cache
+        report = errors if errors is not None else []
+        pairs = []
+        if workers and workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as ex:
+                futures = []
+                start = 0
+                for chunk in _chunks(rows, chunk_size):
+                    futures.append(ex.submit(_rows_to_records, start, chunk, mapping, date_formats))
+                    start += len(chunk)
+                for fut in futures:
+                    chunk_pairs, chunk_report = fut.result()
+                    pairs.extend(chunk_pairs)
+                    report.extend(chunk_report)
+        else:
+            pairs, chunk_report = _rows_to_records(0, rows, mapping, date_formats)
+            report.extend(chunk_report)
+        added = self._insert_many(pairs, report)
+        report.sort(key=lambda e: e['row'])
+        return added
+
+    def import_csv(self, csv_path, columns=None, delimiter=',', encoding='utf-8-sig',
+                   errors=None, workers=None, chunk_size=IMPORT_CHUNK, date_formats=DATE_FORMATS):
+        # columns maps CSV header -> Record field; by default headers are
+        # matched to field names (case/spacing-insensitive, common aliases).
+        # Row numbers in errors count data rows from 0, header excluded.
+        with open(csv_path, 'r', encoding=encoding, newline='') as f:
+            reader = csv.reader(f, delimiter=delimiter)
+            headers = next(reader, None)
+            if headers is None:
+                return 0
+            mapping = _map_columns(headers, columns)
+            if 'date' in mapping:
+                # Scan for the day/month order, then start over after the header.
+                date_formats = _settle_day_month(_date_values(reader, mapping), date_formats)
+                f.seek(0)
+                reader = csv.reader(f, delimiter=delimiter)
+                next(reader)
+            return self._import_rows(reader, mapping, errors, workers, chunk_size, date_formats)
+
+    def import_excel(self, excel_path, sheet_name=0, columns=None,
+                     errors=None, workers=None, chunk_size=IMPORT_CHUNK, date_formats=DATE_FORMATS):
+        try:
+            import pandas as pd
+        except ImportError:
+            raise RuntimeError('pandas is required to import from excel')
+        df = pd.read_excel(excel_path, sheet_name=sheet_name, dtype=object)
+        mapping = _map_columns(list(df.columns), columns)
+        rows = [[None if _is_blank(v) else (v.to_pydatetime() if hasattr(v, 'to_pydatetime') else v) for v in row]
+                for row in df.itertuples(index=False, name=None)]
+        date_formats = _settle_day_month(_date_values(rows, mapping), date_formats)
+        return self._import_rows(rows, mapping, errors, workers, chunk_size, date_formats)
+
+    def _read_range(self, start, length):
+        if self.file is None:
+            self.open()
+        if self.block_cache:
+            return self.block_cache.read(self.file, self._cache_key, start, length)
+        self.file.seek(start)
+        return self.file.read(length)
+
+    def _cached_write(self, start, data):
+        if self.block_cache:
+            self.block_cache.write(self._cache_key, start, data)
+
+    def _drop_cached(self):
+        if self.block_cache:
+            self.block_cache.drop_file(self._cache_key)
+
+    def _touch_cached(self):
+        if self.block_cache and os.path.exists(self.filepath):
+            st = os.stat(self.filepath)
+            self.block_cache.touch(self._cache_key, (st.st_size, st.st_mtime_ns))
+
+    def _read_raw(self, offset):
+        bs = self._read_range(offset, RECORD_SIZE)
         if not bs or len(bs) < RECORD_SIZE:
             return None
-        return Record.unpack(bs)
+        return bs
+
+    def _read_at(self, offset):
+        bs = self._read_raw(offset)
+        return Record.unpack(bs) if bs else None
+
+    def _end_offset(self):
+        if self.file is None:
+            self.open()
+        self.file.seek(0, os.SEEK_END)
+        return self.file.tell()
 
     def get_by_id(self, id_):
         if id_ not in self.index:
@@ -290,56 +1537,149 @@ class Database:
             return rec
         return None
 
+    def get_many(self, ids):
+        # One pass over the file in offset order instead of a random seek per id.
+        found = sorted((self.index[i], i) for i in set(ids) if i in self.index)
+        result = {}
+        for offset, id_ in found:
+            rec = self._read_at(offset)
+            if rec and rec.active:
+                result[id_] = rec
+        return result
+
     def delete_by_id(self, id_):
         if id_ not in self.index:
             return 0
         offset = self.index[id_]
-        if self.file is None:
-            self.open()
-        self.file.seek(offset)
-        bs = self.file.read(RECORD_SIZE)
-        rec = Record.unpack(bs)
+        rec = self._read_at(offset)
         rec.active = 0
-        self.file.seek(offset)
-        self.file.write(rec.pack())
-        self.file.flush()
+        self._write_at(offset, rec)
 
         if id_ in self.index:
             del self.index[id_]
+        self._emit('delete', id=id_)
 
         self._renumber_ids()
         self._save_index()
         return 1
 
     def delete_by_field(self, field, value):
-        count = 0
         if field == 'id':
             try:
                 return self.delete_by_id(int(value))
             except Exception:
                 return 0
-        if self.file is None:
-            self.open()
-        self.file.seek(0)
-        offset = 0
-        while True:
-            bs = self.file.read(RECORD_SIZE)
-            if not bs or len(bs) < RECORD_SIZE:
-                break
-            rec = Record.unpack(bs)
-            if rec.active and getattr(rec, field) == value:
-                rec.active = 0
-                self.file.seek(offset)
-                self.file.write(rec.pack())
-                self.file.flush()
-                if rec.id in self.index:
-                    del self.index[rec.id]
-                count += 1
-            offset += RECORD_SIZE
-        if count > 0:
-            self._renumber_ids()
-            self._save_index()
-        return count
+        return self.delete_where({field: value})
+
+    def _where(self, predicate):
+        # predicate is a callable taking a Record or a {field: value} dict.
+        # Returns matching (offset, record) pairs in file order from one pass,
+        # or straight from the primary or fighter index when the dict allows.
+        found = self._where_indexed(predicate)
+        if found is not None:
+            return found
+        match = self._matcher(predicate)
+        return [(offset, rec) for offset, rec in self._scan() if rec.active and match(rec)]
+
+    @staticmethod
+    def _matcher(predicate):
+        if isinstance(predicate, dict):
+            conds = dict(predicate)
+            return lambda r: all(getattr(r, f) == v for f, v in conds.items())
+        return predicate
+
+    def _where_indexed(self, predicate):
+        # The matches when an index can answer the predicate, else None.
+        if not isinstance(predicate, dict):
+            return None
+        conds = dict(predicate)
+        if 'id' in conds:
+            try:
+                id_ = int(conds.pop('id'))
+            except (TypeError, ValueError):
+                return []
+            if id_ not in self.index:
+                return []
+            rec = self._read_at(self.index[id_])
+            if rec and rec.active and all(getattr(rec, f) == v for f, v in conds.items()):
+                return [(self.index[id_], rec)]
+            return []
+        ids = self._fighter_candidates(conds)
+        if ids is None:
+            return None
+        match = self._matcher(conds)
+        found = self.get_many(ids)
+        return sorted(((self.index[i], r) for i, r in found.items() if match(r)), key=lambda t: t[0])
+
+    def find_where(self, predicate):
+        # Records matching a {field: value} dict or a callable, in file order.
+        return [rec for _, rec in self._where(predicate)]
+
+    def _fighter_candidates(self, conds):
+        if self._fighters is None:
+            return None
+        for f in FIGHTER_FIELDS:
+            if f in conds:
+                ids = self._fighters.candidates(f, conds[f])
+                if ids is not None:
+                    return ids
+        return None
+
+    def delete_where(self, predicate):
+        targets = self._where(predicate)
+        if not targets:
+            return 0
+        for _, rec in targets:
+            rec.active = 0
+        self._write_many(targets)
+        for _, rec in targets:
+            self.index.pop(rec.id, None)
+            self._emit('delete', id=rec.id)
+        self._renumber_ids()
+        return len(targets)
+
+    def update_where(self, predicate, **changes):
+        # All matched records are validated and duplicate-checked before any
+        # is written, so a failing batch leaves the file untouched.
+        changes = {k: v for k, v in changes.items() if k in FIELDS and k != 'id' and v is not None}
+        if not changes:
+            return 0
+        # One pass over the file collects both the targets and the keys of
+        # every other record for the duplicate check; an index-served
+        # predicate still needs that pass for the keys.
+        targets = self._where_indexed(predicate)
+        seen = set()
+        if targets is None:
+            match = self._matcher(predicate)
+            targets = []
+            for offset, rec in self._scan():
+                if not rec.active:
+                    continue
+                if match(rec):
+                    targets.append((offset, rec))
+                else:
+                    seen.add(_record_key(rec))
+        elif targets:
+            target_offsets = set(offset for offset, _ in targets)
+            seen = set(_record_key(rec) for offset, rec in self._scan()
+                       if rec.active and offset not in target_offsets)
+        if not targets:
+            return 0
+        writes = []
+        for offset, rec in targets:
+            for k, v in changes.items():
+                setattr(rec, k, v)
+            _validate(rec)
+            key = _record_key(rec)
+            if key in seen:
+                raise ValueError(f'Update would create duplicate record (identical fields except id) for id {rec.id}')
+            seen.add(key)
+            writes.append((offset, rec))
+        self._write_many(writes)
+        for _, rec in writes:
+            self._emit('edit', id=rec.id, record=rec.to_dict())
+        self._save_index()
+        return len(writes)
 
     def search(self, field, value):
         results = []
@@ -350,14 +1690,9 @@ class Database:
                 return []
             if rec: results.append(rec)
             return results
-        if self.file is None:
-            self.open()
-        self.file.seek(0)
-        while True:
-            bs = self.file.read(RECORD_SIZE)
-            if not bs or len(bs) < RECORD_SIZE:
-                break
-            rec = Record.unpack(bs)
+        if field in FIGHTER_FIELDS and self._fighter_candidates({field: value}) is not None:
+            return [rec for _, rec in self._where({field: value})]
+        for _, rec in self._scan():
             if rec.active and getattr(rec, field) == value:
                 results.append(rec)
         return results
@@ -376,31 +1711,14 @@ class Database:
             if hasattr(newrec, k) and k != 'id' and v is not None:
                 setattr(newrec, k, v)
 
-        if _is_numeric_only(newrec.fighter_1) or _is_numeric_only(newrec.fighter_2) or _is_numeric_only(newrec.winner):
-            raise ValueError('Fighter names/winner must not be numeric-only strings')
-        if not _validate_fight_time_mmss(newrec.fight_time):
-            raise ValueError('fight_time must be in MM:SS format, seconds 00-59')
-        if newrec.card_type not in CARD_TYPES:
-            raise ValueError(f'card_type must be one of {CARD_TYPES}')
-        if newrec.weight_class not in WEIGHT_CLASSES:
-            raise ValueError(f'weight_class must be one of {WEIGHT_CLASSES}')
-        if newrec.winner and not (newrec.winner == newrec.fighter_1 or newrec.winner == newrec.fighter_2):
-            raise ValueError('winner must be one of fighter_1 or fighter_2')
+        _validate(newrec)
 
-        if self.file is None:
-            self.open()
-        self.file.seek(0)
-        while True:
-            bs = self.file.read(RECORD_SIZE)
-            if not bs or len(bs) < RECORD_SIZE:
-                break
-            other = Record.unpack(bs)
+        for _, other in self._scan():
             if other.active and other.id != newrec.id and self._record_equals_except_id(other, newrec):
                 raise ValueError('Edit would create duplicate record (identical fields except id)')
 
-        self.file.seek(offset)
-        self.file.write(newrec.pack())
-        self.file.flush()
+        self._write_at(offset, newrec)
+        self._emit('edit', id=newrec.id, record=newrec.to_dict())
         return newrec
 
     def backup(self, backup_path):
@@ -418,6 +1736,7 @@ class Database:
                     self.file = None
                 except Exception:
                     self.file = None
+            self._touch_cached()
             shutil.copy2(self.filepath, backup_path)
             if os.path.exists(self.indexpath):
                 shutil.copy2(self.indexpath, backup_path + '.idx')
@@ -429,16 +1748,21 @@ class Database:
                 self.file = None
 
     def restore_from_backup(self, backup_path):
+        self._invalidate_snapshots()
         if self.file:
             self.file.close(); self.file = None
         shutil.copy2(backup_path, self.filepath)
+        self._drop_cached()
         if os.path.exists(backup_path + '.idx'):
             shutil.copy2(backup_path + '.idx', self.indexpath)
         else:
             self._rebuild_index()
         self.open()
+        self._emit('restore', source=backup_path)
 
-    def import_json(self, json_path, id_field='id'):
+    def import_json(self, json_path, id_field='id', errors=None, workers=None):
+        # Rows that fail are skipped; pass a list as errors to collect a
+        # per-row report of {'row', 'field', 'reason'} entries.
         with open(json_path,'r',encoding='utf-8') as f:
             data = json.load(f)
         if isinstance(data, dict):
@@ -450,63 +1774,477 @@ class Database:
                 return 0
         if not isinstance(data, list):
             return 0
-        added = 0
-        for item in data:
+        report = errors if errors is not None else []
+        rows, records = [], []
+        for row, item in enumerate(data):
             try:
-                rec = Record(
-                    int(item.get(id_field, 0) or 0),
-                    item.get('date','0000-00-00'),
-                    item.get('fight_time','00:00'),
-                    item.get('event',''),
-                    item.get('location',''),
-                    item.get('card_type', CARD_TYPES[0]),
-                    item.get('weight_class', WEIGHT_CLASSES[0]),
-                    item.get('fighter_1',''),
-                    item.get('fighter_2',''),
-                    item.get('winner','')
-                )
-                self.add(rec)
-                added += 1
-            except Exception:
-                continue
+                records.append(Record.from_dict(item, id_field))
+                rows.append(row)
+            except Exception as e:
+                report.append({'row': row, 'field': None, 'reason': str(e)})
+        invalid = set()
+        for e in validate_records(records, workers):
+            e['row'] = rows[e['row']]
+            invalid.add(e['row'])
+            report.append(e)
+        added = self._insert_many([(row, rec) for row, rec in zip(rows, records) if row not in invalid], report)
+        report.sort(key=lambda e: e['row'])
         return added
 
     def export_excel(self, excel_path, id_col='id'):
-        try:
-            import pandas as pd
-        except ImportError:
-            raise RuntimeError('pandas is required to export to excel')
-        rows = []
-        for r in self.iterate():
-            rows.append({
-                'id': r.id,
-                'date': r.date,
-                'fight_time': r.fight_time,
-                'event': r.event,
-                'location': r.location,
-                'card_type': r.card_type,
-                'weight_class': r.weight_class,
-                'fighter_1': r.fighter_1,
-                'fighter_2': r.fighter_2,
-                'winner': r.winner
-            })
-        df = pd.DataFrame(rows)
-        df.to_excel(excel_path, index=False)
-        return len(rows)
+        return _write_excel(self.iterate(), excel_path)
+
+    def compact(self):
+        # Rewrites the file without deleted records. Ids do not change, but
+        # offsets do, so open snapshots are invalidated.
+        if self.file is None:
+            self.open()
+        self._invalidate_snapshots()
+        tmp_path = self.filepath + '.tmp'
+        with open(tmp_path, 'wb') as out:
+            if self.data_start:
+                out.write(struct.pack(HEADER_FMT, HEADER_MAGIC, FORMAT_VERSION, self.data_start, 0, 0, 0, 0).ljust(self.data_start, b'\x00'))
+            for _, rec in self._scan():
+                if rec.active:
+                    out.write(rec.pack())
+        self.file.close(); self.file = None
+        os.replace(tmp_path, self.filepath)
+        self._drop_cached()
+        self.open()
+        self._rebuild_index()
+
+    def stats(self):
+        if self.file is None:
+            self.open()
+        records = (self._end_offset() - self.data_start) // RECORD_SIZE
+        live = len(self.index)
+        return {
+            'path': self.filepath,
+            'file_size': os.path.getsize(self.filepath),
+            'format_version': self.header['version'] if self.header else 1,
+            'record_size': RECORD_SIZE,
+            'records': records,
+            'live': live,
+            'deleted': records - live,
+            'seq': self.seq,
+            'block_cache': self.block_cache.stats() if self.block_cache else None,
+        }
 
     def iterate(self):
         if not os.path.exists(self.filepath):
             return
-        if self.file is None:
-            self.open()
-        self.file.seek(0)
-        while True:
-            bs = self.file.read(RECORD_SIZE)
-            if not bs or len(bs) < RECORD_SIZE:
-                break
-            rec = Record.unpack(bs)
+        for _, rec in self._scan():
             if rec.active:
                 yield rec
 
 
     
+PAGE_RECORDS = 64
+PAGE_FILE_MAGIC = b'UFCPAGED'
+PAGE_FILE_HDR_FMT = '<8sHH'
+PAGE_FILE_HDR_SIZE = struct.calcsize(PAGE_FILE_HDR_FMT)
+PAGE_MAGIC = b'UFCP'
+PAGE_HDR_FMT = '<4sIBBIIII'
+PAGE_HDR_SIZE = struct.calcsize(PAGE_HDR_FMT)
+PAGE_FORMAT_VERSION = 1
+PAGE_FREE = 1
+PAGE_FLAGS_POS = struct.calcsize('<4sIB')
+# The .pdir starts with a magic and the CRC32 of the pickled directory, which
+# also records the data file size and the .idx checksum it was saved with.
+PDIR_MAGIC = b'UFCPDIR1'
+PDIR_HDR_FMT = '<8sI'
+PDIR_HDR_SIZE = struct.calcsize(PDIR_HDR_FMT)
+
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+CODEC_LZ4 = 2
+
+def _compress(raw, codec):
+    if codec == CODEC_LZ4:
+        return _lz4.compress(raw)
+    if codec == CODEC_ZLIB:
+        return zlib.compress(raw, 6)
+    return raw
+
+def _decompress(data, codec):
+    if codec == CODEC_LZ4:
+        if _lz4 is None:
+            raise RuntimeError('lz4 is required to read this database')
+        return _lz4.decompress(data)
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(data)
+    return data
+
+
+class PagedDatabase(Database):
+    # Records are grouped into pages of PAGE_RECORDS slots; every page is stored
+    # compressed with its own header and CRC32. Index offsets stay logical
+    # (slot * RECORD_SIZE), so all Database operations work unchanged.
+    def __init__(self, filepath, page_records=PAGE_RECORDS, cache_pages=256, codec=None, changelog=False):
+        # Pages have their own decompressed-page LRU, so the block cache is off.
+        super().__init__(filepath, changelog, block_cache=False)
+        self.pagespath = filepath + '.pdir'
+        self.page_records = page_records
+        self.cache_pages = cache_pages
+        self.codec = codec if codec is not None else (CODEC_LZ4 if _lz4 else CODEC_ZLIB)
+        self.pages = {}
+        self.record_count = 0
+        self._cache = OrderedDict()
+        self._dirty = set()
+
+    def create(self, overwrite=False):
+        if os.path.exists(self.filepath) and not overwrite:
+            raise FileExistsError('DB file already exists')
+        with open(self.filepath, 'wb') as f:
+            f.write(struct.pack(PAGE_FILE_HDR_FMT, PAGE_FILE_MAGIC, PAGE_FORMAT_VERSION, self.page_records))
+        self.index = {}
+        self.pages = {}
+        self.record_count = 0
+        self._cache.clear()
+        self._dirty.clear()
+        self._save_index()
+
+    def open(self):
+        if not os.path.exists(self.filepath):
+            raise FileNotFoundError('DB file not found')
+        self.file = open(self.filepath, 'r+b')
+        magic, version, page_records = struct.unpack(PAGE_FILE_HDR_FMT, self.file.read(PAGE_FILE_HDR_SIZE).ljust(PAGE_FILE_HDR_SIZE, b'\x00'))
+        if magic != PAGE_FILE_MAGIC:
+            self.file.close(); self.file = None
+            raise ValueError('not a paged database file')
+        if version > PAGE_FORMAT_VERSION:
+            self.file.close(); self.file = None
+            raise ValueError(f'unsupported paged format version {version}')
+        self.page_records = page_records
+        self._cache.clear()
+        self._dirty.clear()
+        meta = self._load_pages_meta()
+        if meta is None:
+            # Missing, damaged or stale (a crash after pages moved but before the
+            # directory was saved): recover both from the page headers.
+            self._rebuild_pages()
+            self._rebuild_index()
+            return
+        self.pages = meta['pages']
+        self.record_count = meta['record_count']
+        data = None
+        if os.path.exists(self.indexpath):
+            with open(self.indexpath, 'rb') as f:
+                data = f.read()
+        if data is not None and zlib.crc32(data) == meta['index_crc']:
+            self.index = pickle.loads(data)
+        else:
+            self._rebuild_index()
+
+    def _load_pages_meta(self):
+        if not os.path.exists(self.pagespath):
+            return None
+        with open(self.pagespath, 'rb') as f:
+            data = f.read()
+        if len(data) < PDIR_HDR_SIZE:
+            return None
+        magic, crc = struct.unpack_from(PDIR_HDR_FMT, data)
+        payload = data[PDIR_HDR_SIZE:]
+        if magic != PDIR_MAGIC or zlib.crc32(payload) != crc:
+            return None
+        meta = pickle.loads(payload)
+        if meta['file_size'] != os.path.getsize(self.filepath):
+            return None
+        return meta
+
+    def close(self):
+        if self.file:
+            self._flush_pages()
+        super().close()
+        self._cache.clear()
+
+    def delete(self):
+        super().delete()
+        if os.path.exists(self.pagespath): os.remove(self.pagespath)
+        self.pages = {}
+        self.record_count = 0
+        self._cache.clear()
+        self._dirty.clear()
+
+    def clear(self):
+        self._invalidate_snapshots()
+        if self.file:
+            self.file.close(); self.file = None
+        self.create(overwrite=True)
+        self.open()
+        self._emit('clear')
+
+    def _save_index(self):
+        if self.file:
+            self._flush_pages()
+            self.file.flush()
+        crc = super()._save_index()
+        if crc is None and os.path.exists(self.indexpath):
+            with open(self.indexpath, 'rb') as f:
+                crc = zlib.crc32(f.read())
+        self._save_pages(crc)
+
+    def _save_pages(self, index_crc):
+        payload = pickle.dumps({'record_count': self.record_count, 'pages': self.pages,
+                                'file_size': os.path.getsize(self.filepath), 'index_crc': index_crc})
+        with open(self.pagespath, 'wb') as f:
+            f.write(struct.pack(PDIR_HDR_FMT, PDIR_MAGIC, zlib.crc32(payload)))
+            f.write(payload)
+
+    def edit(self, id_, **kwargs):
+        # Plain files are written through by _write_at; here the page is only
+        # dirty in the cache until flushed, so flush before returning.
+        rec = super().edit(id_, **kwargs)
+        self._save_index()
+        return rec
+
+    def _rebuild_index(self):
+        self.index = {}
+        for offset, rec in self._scan():
+            if rec.active:
+                self.index[rec.id] = offset
+        self._save_index()
+
+    def _rebuild_pages(self):
+        # Recover the page directory from the self-describing page headers.
+        self.pages = {}
+        self.record_count = 0
+        self.file.seek(0, os.SEEK_END)
+        end = self.file.tell()
+        pos = PAGE_FILE_HDR_SIZE
+        while pos + PAGE_HDR_SIZE <= end:
+            self.file.seek(pos)
+            magic, page_no, codec, flags, capacity, raw_len, comp_len, crc = struct.unpack(
+                PAGE_HDR_FMT, self.file.read(PAGE_HDR_SIZE))
+            if magic != PAGE_MAGIC or pos + PAGE_HDR_SIZE + capacity > end:
+                break
+            if not flags & PAGE_FREE:
+                self.pages[page_no] = [pos, capacity, comp_len, crc]
+                self.record_count = max(self.record_count, page_no * self.page_records + raw_len // RECORD_SIZE)
+            pos += PAGE_HDR_SIZE + capacity
+
+    def _read_page(self, page_no):
+        if page_no not in self.pages:
+            return bytearray()
+        pos, capacity, comp_len, crc = self.pages[page_no]
+        self.file.seek(pos)
+        hdr = struct.unpack(PAGE_HDR_FMT, self.file.read(PAGE_HDR_SIZE))
+        data = self.file.read(comp_len)
+        if hdr[0] != PAGE_MAGIC or hdr[1] != page_no or zlib.crc32(data) != crc:
+            raise IOError(f'page {page_no} at offset {pos} is corrupted (checksum mismatch)')
+        return bytearray(_decompress(data, hdr[2]))
+
+    def _load_page(self, page_no):
+        page = self._cache.get(page_no)
+        if page is not None:
+            self._cache.move_to_end(page_no)
+            return page
+        page = self._read_page(page_no)
+        self._cache[page_no] = page
+        while len(self._cache) > self.cache_pages:
+            old_no, old_page = self._cache.popitem(last=False)
+            if old_no in self._dirty:
+                self._write_page(old_no, old_page)
+                self._dirty.discard(old_no)
+        return page
+
+    def _write_page(self, page_no, page):
+        raw = bytes(page)
+        data = _compress(raw, self.codec)
+        crc = zlib.crc32(data)
+        slot = self.pages.get(page_no)
+        new_slot = slot is None or slot[1] < len(data)
+        if not new_slot:
+            pos, capacity = slot[0], slot[1]
+        else:
+            self.file.seek(0, os.SEEK_END)
+            pos = self.file.tell()
+            # Leave headroom so a growing tail page can be rewritten in place.
+            capacity = len(data) if len(raw) >= self.page_records * RECORD_SIZE else len(data) * 2 + 64
+        self.file.seek(pos)
+        self.file.write(struct.pack(PAGE_HDR_FMT, PAGE_MAGIC, page_no, self.codec, 0, capacity, len(raw), len(data), crc))
+        self.file.write(data)
+        if new_slot:
+            self.file.write(b'\x00' * (capacity - len(data)))
+            if slot is not None:
+                # Free the old copy only once the new one is on disk; if we die
+                # in between, _rebuild_pages keeps the later of the two copies.
+                self.file.flush()
+                self.file.seek(slot[0] + PAGE_FLAGS_POS)
+                self.file.write(struct.pack('<B', PAGE_FREE))
+                self.file.flush()
+        self.pages[page_no] = [pos, capacity, len(data), crc]
+
+    def _flush_pages(self):
+        if not self._dirty:
+            return
+        for page_no in sorted(self._dirty):
+            self._write_page(page_no, self._cache[page_no])
+        self._dirty.clear()
+        self.file.flush()
+
+    def _scan(self):
+        if self.file is None:
+            self.open()
+        pr = self.page_records
+        npages = (self.record_count + pr - 1) // pr
+        for page_no in range(npages):
+            # Pages not already cached are streamed without polluting the cache.
+            page = self._cache.get(page_no)
+            if page is None:
+                page = self._read_page(page_no)
+            base = page_no * pr
+            for i in range(min(pr, self.record_count - base)):
+                yield (base + i) * RECORD_SIZE, Record.unpack(bytes(page[i * RECORD_SIZE:(i + 1) * RECORD_SIZE]))
+
+    def _read_raw(self, offset):
+        if self.file is None:
+            self.open()
+        slot = offset // RECORD_SIZE
+        if slot >= self.record_count:
+            return None
+        page = self._load_page(slot // self.page_records)
+        pos = (slot % self.page_records) * RECORD_SIZE
+        return bytes(page[pos:pos + RECORD_SIZE])
+
+    def _end_offset(self):
+        return self.record_count * RECORD_SIZE
+
+    def _write_at(self, offset, rec):
+        self._preserve(offset)
+        slot = offset // RECORD_SIZE
+        page_no = slot // self.page_records
+        page = self._load_page(page_no)
+        pos = (slot % self.page_records) * RECORD_SIZE
+        page[pos:pos + RECORD_SIZE] = rec.pack()
+        self._dirty.add(page_no)
+
+    def _write_many(self, items):
+        for offset, rec in sorted(items, key=lambda it: it[0]):
+            self._write_at(offset, rec)
+
+    def _append(self, rec):
+        offset = self.record_count * RECORD_SIZE
+        self.record_count += 1
+        self._write_at(offset, rec)
+        return offset
+
+    def _append_many(self, recs):
+        return [self._append(rec) for rec in recs]
+
+    def _verify_records(self, workers):
+        entries, problems = [], []
+        pr = self.page_records
+        for page_no in range((self.record_count + pr - 1) // pr):
+            try:
+                page = self._cache.get(page_no)
+                if page is None:
+                    page = self._read_page(page_no)
+            except (IOError, zlib.error) as e:
+                problems.append({'kind': 'page_checksum', 'offset': page_no * pr * RECORD_SIZE, 'id': None, 'detail': str(e)})
+                continue
+            base = page_no * pr
+            for i in range(min(pr, self.record_count - base)):
+                bs = bytes(page[i * RECORD_SIZE:(i + 1) * RECORD_SIZE])
+                if len(bs) < RECORD_SIZE:
+                    problems.append({'kind': 'short_page', 'offset': (base + i) * RECORD_SIZE, 'id': None, 'detail': f'page {page_no}'})
+                    break
+                entries.append(_inspect_raw((base + i) * RECORD_SIZE, bs, problems))
+        return entries, problems
+
+    def repair(self, workers=None):
+        # Pages that fail their checksum cannot be decompressed; their slots
+        # are replaced with deleted (zeroed) records so the rest is usable.
+        if self.file is None:
+            self.open()
+        pr = self.page_records
+        for page_no in self.verify_pages():
+            count = min(pr, self.record_count - page_no * pr)
+            self._cache[page_no] = bytearray(count * RECORD_SIZE)
+            self._dirty.add(page_no)
+        self._flush_pages()
+        return super().repair(workers)
+
+    def _layout_confirmed(self):
+        return True  # open() checked the paged magic
+
+    def verify_pages(self):
+        if self.file is None:
+            self.open()
+        self._flush_pages()
+        bad = []
+        for page_no in sorted(self.pages):
+            try:
+                self._read_page(page_no)
+            except (IOError, zlib.error):
+                bad.append(page_no)
+        return bad
+
+    def compact(self):
+        # Rewrite live pages back to back, dropping free slots and headroom.
+        if self.file is None:
+            self.open()
+        self._flush_pages()
+        tmp_path = self.filepath + '.tmp'
+        pages = {}
+        with open(tmp_path, 'wb') as out:
+            out.write(struct.pack(PAGE_FILE_HDR_FMT, PAGE_FILE_MAGIC, PAGE_FORMAT_VERSION, self.page_records))
+            for page_no in sorted(self.pages):
+                pos, capacity, comp_len, crc = self.pages[page_no]
+                self.file.seek(pos)
+                hdr = list(struct.unpack(PAGE_HDR_FMT, self.file.read(PAGE_HDR_SIZE)))
+                data = self.file.read(comp_len)
+                hdr[4] = comp_len
+                pages[page_no] = [out.tell(), comp_len, comp_len, crc]
+                out.write(struct.pack(PAGE_HDR_FMT, *hdr))
+                out.write(data)
+        self.file.close(); self.file = None
+        os.replace(tmp_path, self.filepath)
+        self.pages = pages
+        self._cache.clear()
+        self._save_index()
+        self.open()
+
+    def backup(self, backup_path):
+        super().backup(backup_path)
+        if os.path.exists(self.pagespath):
+            shutil.copy2(self.pagespath, backup_path + '.pdir')
+
+    def restore_from_backup(self, backup_path):
+        self._invalidate_snapshots()
+        if self.file:
+            self.file.close(); self.file = None
+        self._cache.clear()
+        self._dirty.clear()
+        shutil.copy2(backup_path, self.filepath)
+        for suffix, path in (('.idx', self.indexpath), ('.pdir', self.pagespath)):
+            if os.path.exists(backup_path + suffix):
+                shutil.copy2(backup_path + suffix, path)
+            elif os.path.exists(path):
+                os.remove(path)
+        self.open()
+        self._emit('restore', source=backup_path)
+
+    def stats(self):
+        st = super().stats()
+        st['format_version'] = PAGE_FORMAT_VERSION
+        st['pages'] = len(self.pages)
+        st['page_records'] = self.page_records
+        st['codec'] = {CODEC_RAW: 'raw', CODEC_ZLIB: 'zlib', CODEC_LZ4: 'lz4'}.get(self.codec)
+        return st
+
+def database_class(filepath):
+    # PagedDatabase for files starting with the paged magic, Database for
+    # anything else (including files that do not exist yet).
+    if os.path.exists(filepath):
+        with open(filepath, 'rb') as f:
+            if f.read(len(PAGE_FILE_MAGIC)) == PAGE_FILE_MAGIC:
+                return PagedDatabase
+    return Database
+
+def open_database(filepath, **kwargs):
+    # Opens a .bin as Database or PagedDatabase depending on its magic bytes.
+    db = database_class(filepath)(filepath, **kwargs)
+    db.open()
+    return db
+
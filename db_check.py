@@ -0,0 +1,53 @@
+import argparse
+import json
+import sys
+
+from database import PagedDatabase, open_database
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Verify (and optionally repair) a UFC file database.')
+    parser.add_argument('db', help='path to the .bin database')
+    parser.add_argument('--repair', action='store_true', help='fix problems in place')
+    parser.add_argument('--paged', action='store_true',
+                        help='require a PagedDatabase (the format is detected from the file either way)')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes for the scan')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+
+    try:
+        db = open_database(args.db)
+    except (ValueError, FileNotFoundError) as e:
+        print(f'{args.db}: {e}', file=sys.stderr)
+        return 2
+    try:
+        if args.paged and not isinstance(db, PagedDatabase):
+            print(f'{args.db}: not a paged database file', file=sys.stderr)
+            return 2
+        report = db.verify(args.workers)
+        if args.repair and report['problems']:
+            before = report['problems']
+            try:
+                report = db.repair(args.workers)
+            except ValueError as e:
+                print(f'{args.db}: {e}', file=sys.stderr)
+                return 2
+            report['repaired'] = before
+    finally:
+        db.close()
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(f"{args.db}: {report['records']} records, {report['active']} live")
+        for p in report.get('repaired', []):
+            print(f"  fixed  {p['kind']:<22} offset={p['offset']} id={p['id']} {p['detail']}")
+        for p in report['problems']:
+            print(f"  {p['kind']:<29} offset={p['offset']} id={p['id']} {p['detail']}")
+        if not report['problems']:
+            print('  OK')
+    return 1 if report['problems'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
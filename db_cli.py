@@ -0,0 +1,312 @@
+import argparse
+import csv
+import json
+import os
+import sys
+
+from database import Database, PagedDatabase, Record, FIELDS, open_database
+from db_server import DatabaseOps
+
+# Headless entry point: python -m database <command> DB ...
+# Records are written to stdout as NDJSON (one JSON object per line) and read
+# from stdin the same way, so commands compose in shell pipelines. The batch
+# command keeps one database open and executes JSON-lines requests from stdin
+# (same protocol as db_server.py), avoiding per-operation open/close costs.
+
+BATCH_SIZE = 10000
+
+
+def _out(obj):
+    sys.stdout.write(json.dumps(obj, ensure_ascii=False) + '\n')
+
+
+def _err(obj):
+    sys.stderr.write(json.dumps(obj, ensure_ascii=False) + '\n')
+
+
+def _write_records(records, limit=None):
+    n = 0
+    for r in records:
+        if limit is not None and n >= limit:
+            break
+        _out(r.to_dict())
+        n += 1
+    return n
+
+
+def _report(added, errors, show_errors):
+    if show_errors:
+        for e in errors:
+            _err(e)
+    _out({'added': added, 'errors': len(errors)})
+    return 0 if not errors else 2
+
+
+def _read_ndjson(stream):
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def cmd_create(db_path, args):
+    db = (PagedDatabase if args.paged else Database)(db_path)
+    db.create(overwrite=args.overwrite)
+    _out({'created': db_path})
+    return 0
+
+
+def cmd_import(db, args):
+    fmt = args.format or os.path.splitext(args.file)[1].lstrip('.').lower()
+    columns = json.loads(args.columns) if args.columns else None
+    errors = []
+    dates = {'date_formats': args.date_format} if args.date_format else {}
+    if fmt == 'json':
+        added = db.import_json(args.file, errors=errors, workers=args.workers)
+    elif fmt == 'csv':
+        added = db.import_csv(args.file, columns=columns, delimiter=args.delimiter, errors=errors,
+                              workers=args.workers, **dates)
+    elif fmt in ('xlsx', 'xls', 'excel'):
+        added = db.import_excel(args.file, columns=columns, errors=errors, workers=args.workers, **dates)
+    else:
+        raise ValueError(f'unknown import format {fmt!r}')
+    return _report(added, errors, args.show_errors)
+
+
+def cmd_add(db, args):
+    # NDJSON records from stdin, inserted in batches through add_many.
+    added, errors, offset, batch = 0, [], 0, []
+    for item in _read_ndjson(sys.stdin):
+        batch.append(Record.from_dict(item))
+        if len(batch) >= args.batch_size:
+            added += _add_batch(db, batch, offset, errors)
+            offset += len(batch)
+            batch = []
+    if batch:
+        added += _add_batch(db, batch, offset, errors)
+    return _report(added, errors, args.show_errors)
+
+
+def _add_batch(db, batch, offset, errors):
+    batch_errors = []
+    added = db.add_many(batch, batch_errors)
+    for e in batch_errors:
+        e['row'] += offset
+    errors.extend(batch_errors)
+    return added
+
+
+def cmd_export(db, args):
+    if args.format == 'xlsx':
+        n = db.export_excel(args.out)
+        _out({'exported': n, 'file': args.out})
+        return 0
+    with db.snapshot() as snap:
+        if args.format == 'csv':
+            out = open(args.out, 'w', encoding='utf-8', newline='') if args.out else sys.stdout
+            try:
+                w = csv.DictWriter(out, fieldnames=FIELDS)
+                w.writeheader()
+                for r in snap.iterate():
+                    w.writerow(r.to_dict())
+            finally:
+                if out is not sys.stdout:
+                    out.close()
+        else:
+            _write_records(snap.iterate(), args.limit)
+    return 0
+
+
+def cmd_get(db, args):
+    found = db.get_many(args.ids)
+    _write_records(found[i] for i in args.ids if i in found)
+    return 0
+
+
+def cmd_search(db, args):
+    _write_records(db.search(args.field, args.value), args.limit)
+    return 0
+
+
+def cmd_query(db, args):
+    where = {}
+    for cond in args.where or []:
+        field, sep, value = cond.partition('=')
+        if not sep or field not in FIELDS:
+            raise ValueError(f'bad --where {cond!r}, expected field=value')
+        where[field] = int(value) if field == 'id' else value
+    if args.fighter and args.vs:
+        records = db.head_to_head(args.fighter, args.vs)
+    elif args.fighter:
+        records = db.fights_of(args.fighter)
+    else:
+        records = None
+    date_from, date_to = args.date_from, args.date_to
+
+    def match(r):
+        if date_from and r.date < date_from:
+            return False
+        if date_to and r.date > date_to:
+            return False
+        return all(getattr(r, f) == v for f, v in where.items())
+
+    if records is None:
+        if where and not (date_from or date_to):
+            records = db.find_where(where)
+        else:
+            records = db.iterate()
+    _write_records((r for r in records if match(r)), args.limit)
+    return 0
+
+
+def cmd_fighter(db, args):
+    st = db.fighter_stats(args.name)
+    st['name'] = args.name
+    _out(st)
+    return 0
+
+
+def cmd_backup(db, args):
+    db.backup(args.dest)
+    _out({'backup': args.dest})
+    return 0
+
+
+def cmd_restore(db, args):
+    db.restore_from_backup(args.src)
+    _out({'restored': args.src, 'live': len(db.index)})
+    return 0
+
+
+def cmd_compact(db, args):
+    before = os.path.getsize(db.filepath)
+    db.compact()
+    _out({'compacted': db.filepath, 'bytes_before': before, 'bytes_after': os.path.getsize(db.filepath)})
+    return 0
+
+
+def cmd_stats(db, args):
+    _out(db.stats())
+    return 0
+
+
+def cmd_check(db, args):
+    report = db.repair(args.workers) if args.repair else db.verify(args.workers)
+    for p in report['problems']:
+        _out(p)
+    _err({'records': report['records'], 'active': report['active'], 'problems': len(report['problems'])})
+    return 1 if report['problems'] else 0
+
+
+def cmd_batch(db, args):
+    ops = DatabaseOps(db)
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        _out(ops.handle_line(line))
+        if args.flush:
+            sys.stdout.flush()
+    return 0
+
+
+def _check_export(parser, args):
+    if args.format == 'xlsx' and not args.out:
+        parser.error('--out is required with --format xlsx')
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m database', description='UFC file database command-line interface.')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def command(name, fn, help_):
+        p = sub.add_parser(name, help=help_)
+        p.add_argument('db', help='path to the .bin database')
+        p.set_defaults(fn=fn)
+        return p
+
+    p = command('create', cmd_create, 'create an empty database')
+    p.add_argument('--paged', action='store_true', help='compressed page-based storage')
+    p.add_argument('--overwrite', action='store_true')
+
+    p = command('import', cmd_import, 'import records from a JSON, CSV or Excel file')
+    p.add_argument('file')
+    p.add_argument('--format', choices=('json', 'csv', 'xlsx'))
+    p.add_argument('--columns', help='JSON object mapping source columns to record fields')
+    p.add_argument('--delimiter', default=',')
+    p.add_argument('--date-format', action='append', metavar='FMT',
+                   help='strptime format for text dates (repeatable; replaces the defaults)')
+    p.add_argument('--workers', type=int)
+    p.add_argument('--show-errors', action='store_true', help='write per-row errors to stderr as NDJSON')
+
+    p = command('add', cmd_add, 'add NDJSON records read from stdin')
+    p.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    p.add_argument('--show-errors', action='store_true')
+
+    p = command('export', cmd_export, 'export records (NDJSON to stdout by default)')
+    p.add_argument('--format', choices=('ndjson', 'csv', 'xlsx'), default='ndjson')
+    p.add_argument('--out', help='output file (required for xlsx)')
+    p.set_defaults(check=_check_export)
+    p.add_argument('--limit', type=int)
+
+    p = command('get', cmd_get, 'print records by id')
+    p.add_argument('ids', type=int, nargs='+')
+
+    p = command('search', cmd_search, 'print records whose field equals value')
+    p.add_argument('field', choices=FIELDS)
+    p.add_argument('value')
+    p.add_argument('--limit', type=int)
+
+    p = command('query', cmd_query, 'filter records by fields, fighter and date range')
+    p.add_argument('--where', action='append', metavar='FIELD=VALUE')
+    p.add_argument('--fighter')
+    p.add_argument('--vs', help='with --fighter: head-to-head fights only')
+    p.add_argument('--date-from')
+    p.add_argument('--date-to')
+    p.add_argument('--limit', type=int)
+
+    p = command('fighter', cmd_fighter, 'print win/loss/fight-time totals for a fighter')
+    p.add_argument('name')
+
+    p = command('backup', cmd_backup, 'copy the database and its index')
+    p.add_argument('dest')
+
+    p = command('restore', cmd_restore, 'replace the database with a backup')
+    p.add_argument('src')
+
+    command('compact', cmd_compact, 'rewrite the file without deleted records')
+    command('stats', cmd_stats, 'print file and record statistics')
+
+    p = command('check', cmd_check, 'verify the database (and optionally repair it)')
+    p.add_argument('--repair', action='store_true')
+    p.add_argument('--workers', type=int)
+
+    p = command('batch', cmd_batch, 'execute JSON-lines requests from stdin against one open database')
+    p.add_argument('--flush', action='store_true', help='flush stdout after every response')
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, 'check', None):
+        args.check(parser, args)
+    try:
+        if args.command == 'create':
+            return args.fn(args.db, args)
+        db = open_database(args.db)
+        try:
+            return args.fn(db, args)
+        finally:
+            db.close()
+    except BrokenPipeError:
+        # The reader (e.g. head) went away; stop quietly like other filters.
+        sys.stdout = open(os.devnull, 'w')
+        return 0
+    except (KeyError, ValueError, FileNotFoundError, FileExistsError, RuntimeError) as e:
+        _err({'error': type(e).__name__, 'message': str(e)})
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
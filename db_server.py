@@ -0,0 +1,328 @@
+import argparse
+import json
+import queue
+import socket
+import socketserver
+import threading
+from contextlib import contextmanager
+
+from database import Record, database_class
+
+# Wire protocol: JSON lines. Each request is {"id": n, "op": name, "args": {...}}
+# and gets exactly one response {"id": n, "ok": true, "result": ...} or
+# {"id": n, "ok": false, "error": type, "message": text}. Responses on one
+# connection come back in request order, so clients may pipeline freely.
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 7341
+
+_ERRORS = {'KeyError': KeyError, 'ValueError': ValueError,
+           'FileNotFoundError': FileNotFoundError, 'FileExistsError': FileExistsError}
+
+
+def _rec(r):
+    return r.to_dict() if r is not None else None
+
+
+class DatabaseOps:
+    # Request dispatch shared by the socket server and the CLI batch mode.
+    def __init__(self, db):
+        self.db = db
+        self.lock = threading.Lock()
+
+    def dispatch(self, op, args):
+        handler = getattr(self, 'op_' + str(op), None)
+        if handler is None:
+            raise ValueError(f'unknown op {op!r}')
+        with self.lock:
+            return handler(**args)
+
+    def handle_request_obj(self, req):
+        rid = req.get('id') if isinstance(req, dict) else None
+        try:
+            if not isinstance(req, dict):
+                raise ValueError('request must be a JSON object')
+            result = self.dispatch(req.get('op'), req.get('args') or {})
+            return {'id': rid, 'ok': True, 'result': result}
+        except Exception as e:
+            return {'id': rid, 'ok': False, 'error': type(e).__name__, 'message': str(e)}
+
+    def handle_line(self, line):
+        try:
+            req = json.loads(line)
+        except ValueError as e:
+            return {'id': None, 'ok': False, 'error': 'ValueError', 'message': f'bad JSON: {e}'}
+        return self.handle_request_obj(req)
+
+    def op_ping(self):
+        return 'pong'
+
+    def op_count(self):
+        return len(self.db.index)
+
+    def op_add(self, record):
+        return self.db.add(Record.from_dict(record))
+
+    def op_add_many(self, records):
+        errors = []
+        added = self.db.add_many([Record.from_dict(r) for r in records], errors)
+        return {'added': added, 'errors': errors}
+
+    def op_get(self, id):
+        return _rec(self.db.get_by_id(int(id)))
+
+    def op_get_many(self, ids):
+        found = self.db.get_many([int(i) for i in ids])
+        return [_rec(found.get(int(i))) for i in ids]
+
+    def op_search(self, field, value):
+        return [_rec(r) for r in self.db.search(field, value)]
+
+    def op_fights_of(self, name):
+        return [_rec(r) for r in self.db.fights_of(name)]
+
+    def op_head_to_head(self, a, b):
+        return [_rec(r) for r in self.db.head_to_head(a, b)]
+
+    def op_fighter_stats(self, name):
+        return self.db.fighter_stats(name)
+
+    def op_edit(self, id, changes):
+        return _rec(self.db.edit(int(id), **changes))
+
+    def op_update_where(self, where, changes):
+        return self.db.update_where(where, **changes)
+
+    def op_delete(self, id):
+        return self.db.delete_by_id(int(id))
+
+    def op_delete_by_field(self, field, value):
+        return self.db.delete_by_field(field, value)
+
+    def op_delete_where(self, where):
+        return self.db.delete_where(where)
+
+    def op_iterate(self, start=0, limit=None):
+        out = []
+        for i, r in enumerate(self.db.iterate()):
+            if i < start:
+                continue
+            if limit is not None and len(out) >= limit:
+                break
+            out.append(_rec(r))
+        return out
+
+    def op_save(self):
+        self.db.save()
+        return True
+
+    def op_batch(self, requests):
+        # Sub-requests run under the already held lock, in order.
+        out = []
+        for req in requests:
+            rid = req.get('id')
+            try:
+                handler = getattr(self, 'op_' + str(req.get('op')), None)
+                if handler is None or req.get('op') == 'batch':
+                    raise ValueError(f'unknown op {req.get("op")!r}')
+                out.append({'id': rid, 'ok': True, 'result': handler(**(req.get('args') or {}))})
+            except Exception as e:
+                out.append({'id': rid, 'ok': False, 'error': type(e).__name__, 'message': str(e)})
+        return out
+
+
+class DatabaseServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, db, address=(DEFAULT_HOST, DEFAULT_PORT)):
+        self.db = db
+        if self.db.file is None:
+            self.db.open()
+        self.ops = DatabaseOps(db)
+        super().__init__(address, _Handler)
+
+    def server_close(self):
+        super().server_close()
+        with self.ops.lock:
+            self.db.save()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            line = line.strip()
+            if not line:
+                continue
+            resp = self.server.ops.handle_line(line)
+            self.wfile.write(json.dumps(resp, ensure_ascii=False).encode('utf-8') + b'\n')
+
+
+class RemoteError(RuntimeError):
+    pass
+
+
+def _raise(resp):
+    exc = _ERRORS.get(resp.get('error'), RemoteError)
+    raise exc(resp.get('message'))
+
+
+class DatabaseClient:
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=None):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.rfile = self.sock.makefile('rb')
+        self._next_id = 0
+        self.pending = 0  # responses sent for but not read yet
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        try:
+            self.rfile.close()
+        finally:
+            self.sock.close()
+
+    def _encode(self, op, args):
+        self._next_id += 1
+        return self._next_id, json.dumps({'id': self._next_id, 'op': op, 'args': args}, ensure_ascii=False).encode('utf-8') + b'\n'
+
+    def _read(self):
+        line = self.rfile.readline()
+        if not line:
+            raise ConnectionError('server closed the connection')
+        return json.loads(line)
+
+    def call_many(self, calls):
+        # Pipelining: send every request in one write, then read the replies.
+        # Returns the raw response objects so callers can handle partial failure.
+        if self.pending:
+            raise ConnectionError('connection has unread responses from an interrupted call')
+        ids, payload = [], []
+        for op, args in calls:
+            rid, line = self._encode(op, args)
+            ids.append(rid)
+            payload.append(line)
+        self.pending = len(ids)
+        self.sock.sendall(b''.join(payload))
+        out = []
+        for rid in ids:
+            resp = self._read()
+            if resp.get('id') != rid:
+                raise ConnectionError(f'response id {resp.get("id")!r} does not match request id {rid}')
+            self.pending -= 1
+            out.append(resp)
+        return out
+
+    def call(self, op, **args):
+        resp = self.call_many([(op, args)])[0]
+        if not resp['ok']:
+            _raise(resp)
+        return resp['result']
+
+    def batch(self, calls):
+        # Single round trip, executed atomically on the server.
+        reqs = [{'id': i, 'op': op, 'args': args} for i, (op, args) in enumerate(calls)]
+        return self.call('batch', requests=reqs)
+
+    def ping(self):
+        return self.call('ping')
+
+    def count(self):
+        return self.call('count')
+
+    def add(self, record):
+        if isinstance(record, Record):
+            record = record.to_dict()
+        return self.call('add', record=record)
+
+    def get_by_id(self, id_):
+        d = self.call('get', id=id_)
+        return Record.from_dict(d) if d else None
+
+    def get_many(self, ids):
+        return [Record.from_dict(d) if d else None for d in self.call('get_many', ids=list(ids))]
+
+    def search(self, field, value):
+        return [Record.from_dict(d) for d in self.call('search', field=field, value=value)]
+
+    def edit(self, id_, **changes):
+        return Record.from_dict(self.call('edit', id=id_, changes=changes))
+
+    def delete_by_id(self, id_):
+        return self.call('delete', id=id_)
+
+    def delete_by_field(self, field, value):
+        return self.call('delete_by_field', field=field, value=value)
+
+    def iterate(self, start=0, limit=None):
+        return [Record.from_dict(d) for d in self.call('iterate', start=start, limit=limit)]
+
+    def save(self):
+        return self.call('save')
+
+
+class ClientPool:
+    # Persistent connections handed out per call site and returned afterwards.
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, size=4, timeout=None):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        try:
+            try:
+                client = self._idle.get_nowait()
+            except queue.Empty:
+                client = DatabaseClient(self.host, self.port, self.timeout)
+            try:
+                yield client
+            except BaseException as e:
+                # Only a connection left between calls goes back: an error from
+                # a completed call is fine, anything that interrupted one (or
+                # broke the socket) would hand the next borrower stale replies.
+                if client.pending or isinstance(e, OSError):
+                    client.close()
+                else:
+                    self._idle.put_nowait(client)
+                raise
+            if client.pending:
+                client.close()
+            else:
+                self._idle.put_nowait(client)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve a UFC file database over TCP (JSON lines).')
+    parser.add_argument('db', help='path to the .bin database')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+    server = DatabaseServer(database_class(args.db)(args.db), (args.host, args.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from database import Database, Record, FIELDS
+
+# A partitioned database is a directory holding one ordinary Database file per
+# partition plus a <name>_meta.json manifest with per-partition min/max values,
+# used to skip partitions that cannot match a query.
+#
+# Every partition gets an ordinal when it is created, never reused, and a
+# record's global id is ordinal * PARTITION_ID_STRIDE + its local id. Inserts
+# into one partition never change the ids in another; as in Database, only a
+# delete renumbers, and only the later records of the same partition.
+
+STAT_FIELDS = tuple(f for f in FIELDS if f != 'id')
+PARTITION_ID_STRIDE = 10 ** 9
+
+PARTITIONERS = {
+    'year': lambda rec: (rec.date or '')[:4] or 'unknown',
+    'weight_class': lambda rec: rec.weight_class,
+    'event': lambda rec: rec.event,
+}
+
+
+def _safe_name(key):
+    return re.sub(r'[^0-9A-Za-z_-]+', '_', str(key)) or '_'
+
+
+class PartitionedDatabase:
+    def __init__(self, directory, name='ufc', partition_by='year', max_workers=4):
+        self.directory = directory
+        self.name = name
+        self.metapath = os.path.join(directory, f'{name}_meta.json')
+        if callable(partition_by):
+            self.partition_by = getattr(partition_by, '__name__', 'custom')
+            self._key = partition_by
+        else:
+            if partition_by not in PARTITIONERS:
+                raise ValueError(f'partition_by must be one of {tuple(PARTITIONERS)} or a callable')
+            self.partition_by = partition_by
+            self._key = PARTITIONERS[partition_by]
+        self.max_workers = max_workers
+        self.meta = None
+        self.dbs = {}
+
+    def create(self, overwrite=False):
+        if os.path.exists(self.metapath) and not overwrite:
+            raise FileExistsError('partitioned DB already exists')
+        os.makedirs(self.directory, exist_ok=True)
+        if overwrite and os.path.exists(self.metapath):
+            self.open()
+            self.delete()
+            os.makedirs(self.directory, exist_ok=True)
+        now = datetime.now().isoformat()
+        self.meta = {
+            'name': self.name,
+            'created_at': now,
+            'last_update': now,
+            'partition_by': self.partition_by,
+            'partitions': {},
+            'next_ordinal': 0,
+        }
+        self._save_meta()
+
+    def open(self):
+        if not os.path.exists(self.metapath):
+            raise FileNotFoundError('partitioned DB manifest not found')
+        with open(self.metapath, 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta.get('partition_by') != self.partition_by:
+            raise ValueError(f'DB is partitioned by {self.meta.get("partition_by")!r}, not {self.partition_by!r}')
+        if 'next_ordinal' not in self.meta:
+            # Manifests written before ordinals existed: number them in key order.
+            for i, k in enumerate(sorted(self.meta['partitions'])):
+                self.meta['partitions'][k]['ordinal'] = i
+            self.meta['next_ordinal'] = len(self.meta['partitions'])
+            self._save_meta()
+        self.dbs = {}
+
+    def close(self):
+        for db in self.dbs.values():
+            db.close()
+        self.dbs = {}
+        if self.meta is not None:
+            self._save_meta()
+
+    def delete(self):
+        for db in self.dbs.values():
+            if db.file:
+                db.file.close(); db.file = None
+        for part in (self.meta or {}).get('partitions', {}).values():
+            Database(os.path.join(self.directory, part['file'])).delete()
+        if os.path.exists(self.metapath):
+            os.remove(self.metapath)
+        self.dbs = {}
+        self.meta = None
+
+    def _save_meta(self):
+        self.meta['last_update'] = datetime.now().isoformat()
+        tmp = self.metapath + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.metapath)
+
+    def _ensure_open(self):
+        if self.meta is None:
+            self.open()
+
+    def partitions(self):
+        self._ensure_open()
+        return sorted(self.meta['partitions'])
+
+    def _db(self, key):
+        db = self.dbs.get(key)
+        if db is None:
+            part = self.meta['partitions'][key]
+            db = Database(os.path.join(self.directory, part['file']))
+            if not os.path.exists(db.filepath):
+                db.create()
+            db.open()
+            self.dbs[key] = db
+        return db
+
+    def _new_partition(self, key):
+        self.meta['partitions'][key] = {
+            'file': f'{self.name}_{_safe_name(key)}.bin',
+            'ordinal': self.meta['next_ordinal'],
+            'record_count': 0,
+            'min': {},
+            'max': {},
+        }
+        self.meta['next_ordinal'] += 1
+
+    def _widen(self, key, rec):
+        part = self.meta['partitions'][key]
+        for f in STAT_FIELDS:
+            v = getattr(rec, f)
+            if f not in part['min'] or v < part['min'][f]:
+                part['min'][f] = v
+            if f not in part['max'] or v > part['max'][f]:
+                part['max'][f] = v
+
+    def refresh_stats(self, key=None):
+        # Deletes and edits only ever leave min/max too wide (still safe for
+        # pruning); this recomputes them exactly.
+        self._ensure_open()
+        for k in ([key] if key is not None else self.partitions()):
+            part = self.meta['partitions'][k]
+            part['min'], part['max'] = {}, {}
+            db = self._db(k)
+            for rec in db.iterate():
+                self._widen(k, rec)
+            part['record_count'] = len(db.index)
+        self._save_meta()
+
+    def _global_id(self, key, local_id):
+        return self.meta['partitions'][key]['ordinal'] * PARTITION_ID_STRIDE + local_id
+
+    def _locate(self, gid):
+        ordinal, local_id = divmod(gid, PARTITION_ID_STRIDE)
+        for k, part in self.meta['partitions'].items():
+            if part['ordinal'] == ordinal and 0 < local_id <= part['record_count']:
+                return k, local_id
+        return None, None
+
+    def _to_global(self, key, rec):
+        rec.id = self._global_id(key, rec.id)
+        return rec
+
+    def count(self):
+        self._ensure_open()
+        return sum(p['record_count'] for p in self.meta['partitions'].values())
+
+    def add(self, record: Record):
+        self._ensure_open()
+        key = str(self._key(record))
+        if key not in self.meta['partitions']:
+            self._new_partition(key)
+        try:
+            local_id = self._db(key).add(record)
+        except Exception:
+            if self.meta['partitions'][key]['record_count'] == 0:
+                self._drop_empty(key)
+            raise
+        part = self.meta['partitions'][key]
+        part['record_count'] += 1
+        self._widen(key, record)
+        self._save_meta()
+        record.id = self._global_id(key, local_id)
+        return record.id
+
+    def _drop_empty(self, key):
+        db = self.dbs.pop(key, None)
+        if db is not None:
+            db.delete()
+        del self.meta['partitions'][key]
+
+    def get_by_id(self, gid):
+        self._ensure_open()
+        key, local_id = self._locate(int(gid))
+        if key is None:
+            return None
+        rec = self._db(key).get_by_id(local_id)
+        return self._to_global(key, rec) if rec else None
+
+    def delete_by_id(self, gid):
+        self._ensure_open()
+        key, local_id = self._locate(int(gid))
+        if key is None:
+            return 0
+        n = self._db(key).delete_by_id(local_id)
+        self.meta['partitions'][key]['record_count'] -= n
+        if self.meta['partitions'][key]['record_count'] == 0:
+            self._drop_empty(key)
+        self._save_meta()
+        return n
+
+    def edit(self, gid, **kwargs):
+        self._ensure_open()
+        key, local_id = self._locate(int(gid))
+        if key is None:
+            raise KeyError('id not found')
+        db = self._db(key)
+        rec = db.get_by_id(local_id)
+        if rec is None:
+            raise KeyError('record inactive or not found')
+        moved = Record(**{f: getattr(rec, f) for f in FIELDS})
+        for k, v in kwargs.items():
+            if hasattr(moved, k) and k != 'id' and v is not None:
+                setattr(moved, k, v)
+        new_key = str(self._key(moved))
+        if new_key == key:
+            newrec = db.edit(local_id, **kwargs)
+            self._widen(key, newrec)
+            self._save_meta()
+            return self._to_global(key, newrec)
+        # The partition key changed: insert into the new partition first so a
+        # validation or duplicate error leaves the original record in place.
+        moved.id = 0
+        new_gid = self.add(moved)
+        self.delete_by_id(gid)
+        return self.get_by_id(new_gid)
+
+    def _may_contain(self, key, field, lo, hi):
+        part = self.meta['partitions'][key]
+        if field not in part['min']:
+            return part['record_count'] > 0
+        try:
+            return not (hi < part['min'][field] or lo > part['max'][field])
+        except TypeError:
+            # Stored values are strings; nothing else can match, as in Database.search.
+            return False
+
+    def _scan_partitions(self, keys, fn):
+        for k in keys:
+            self._db(k)
+        results = []
+        if len(keys) <= 1 or self.max_workers <= 1:
+            chunks = [fn(self.dbs[k]) for k in keys]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(keys))) as ex:
+                chunks = list(ex.map(lambda k: fn(self.dbs[k]), keys))
+        for k, recs in zip(keys, chunks):
+            results.extend(self._to_global(k, r) for r in recs)
+        return results
+
+    def search(self, field, value):
+        self._ensure_open()
+        if field == 'id':
+            try:
+                rec = self.get_by_id(int(value))
+            except (TypeError, ValueError):
+                return []
+            return [rec] if rec else []
+        keys = [k for k in self.partitions() if self._may_contain(k, field, value, value)]
+        return self._scan_partitions(keys, lambda db: db.search(field, value))
+
+    def search_range(self, field, lo, hi):
+        self._ensure_open()
+        keys = [k for k in self.partitions() if self._may_contain(k, field, lo, hi)]
+        return self._scan_partitions(
+            keys, lambda db: [r for r in db.iterate() if lo <= getattr(r, field) <= hi])
+
+    def iterate(self):
+        self._ensure_open()
+        for k in self.partitions():
+            for rec in self._db(k).iterate():
+                yield self._to_global(k, rec)
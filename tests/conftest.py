@@ -0,0 +1,43 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database, PagedDatabase, Record
+
+
+def make_record(i, **changes):
+    fields = dict(date='2024-01-%02d' % (i % 28 + 1), fight_time='%d:%02d' % (i % 5, i % 60),
+                  event='UFC %d' % (i // 10), location='Las Vegas', card_type='Main Card',
+                  weight_class='Lightweight', fighter_1='F%d' % i, fighter_2='G%d' % i, winner='F%d' % i)
+    fields.update(changes)
+    return Record(0, **fields)
+
+
+@pytest.fixture
+def rec():
+    return make_record
+
+
+@pytest.fixture
+def db(tmp_path):
+    d = Database(str(tmp_path / 'ufc.bin'))
+    d.create()
+    d.open()
+    yield d
+    d.close()
+
+
+@pytest.fixture(params=[Database, PagedDatabase], ids=['plain', 'paged'])
+def any_db(request, tmp_path):
+    d = request.param(str(tmp_path / 'ufc.bin'))
+    d.create()
+    d.open()
+    yield d
+    d.close()
+
+
+def dump(records):
+    return [r.to_dict() for r in records]
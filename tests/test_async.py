@@ -0,0 +1,38 @@
+import asyncio
+
+from conftest import make_record
+from async_database import AsyncDatabase
+from database import PagedDatabase
+
+
+def test_async_add_get_iterate(tmp_path):
+    path = str(tmp_path / 'a.bin')
+
+    async def main():
+        db = AsyncDatabase(path)
+        await db.create()
+        await db.open()
+        ids = await asyncio.gather(*(db.add(make_record(i)) for i in range(50)))
+        assert sorted(ids) == list(range(1, 51))
+        # Issued in the same tick: coalesced into one get_many.
+        recs = await asyncio.gather(*(db.get_by_id(i) for i in (3, 1, 2, 999, 3)))
+        assert [r and r.fighter_1 for r in recs] == ['F2', 'F0', 'F1', None, 'F2']
+        seen = 0
+        async for r in db.iterate():
+            seen += 1
+            if seen == 10:
+                await db.edit(40, location='X')
+        assert seen == 50
+        assert [r.id for r in await db.search('location', 'X')] == [40]
+        await db.delete_by_id(1)
+        assert (await db.get_by_id(1)).fighter_1 == 'F1'
+        await db.close()
+
+    asyncio.run(main())
+
+
+def test_async_default_picks_paged_class(tmp_path):
+    path = str(tmp_path / 'p.bin')
+    p = PagedDatabase(path)
+    p.create()
+    assert isinstance(AsyncDatabase(path).db, PagedDatabase)
@@ -0,0 +1,87 @@
+import os
+import random
+
+from conftest import dump, make_record
+from database import BlockCache, Database
+
+
+def _pair(tmp_path, cache):
+    path = str(tmp_path / 'b.bin')
+    cached = Database(path, block_cache=cache)
+    cached.create()
+    cached.open()
+    direct = Database(path, block_cache=False)
+    direct.open()
+    return cached, direct
+
+
+def test_cached_reads_match_direct_reads_after_writes(tmp_path):
+    cache = BlockCache(block_size=4096, budget=64 * 4096)
+    cached, direct = _pair(tmp_path, cache)
+    cached.add_many([make_record(i) for i in range(500)])
+    list(cached.iterate())
+    cached.edit(7, event='CHANGED')
+    cached.update_where({'event': 'UFC 3'}, location='X')
+    cached.delete_by_id(10)
+    cached.add(make_record(9999))
+    direct.close()
+    direct.open()
+    assert dump(cached.iterate()) == dump(direct.iterate())
+    ids = random.Random(1).sample(sorted(cached.index), 50)
+    assert {k: v.to_dict() for k, v in cached.get_many(ids).items()} == \
+           {k: v.to_dict() for k, v in direct.get_many(ids).items()}
+    cached.compact()
+    assert dump(cached.iterate()) == dump(direct.iterate())
+    assert cache.stats()['hits'] > 0
+
+
+def test_sequential_scan_prefetches_and_hits(tmp_path):
+    cache = BlockCache(block_size=4096, budget=1 << 20)
+    cached, _ = _pair(tmp_path, cache)
+    cached.add_many([make_record(i) for i in range(400)])
+    cache.clear()
+    cache.reset_stats()
+    cached.search('event', 'UFC 1')
+    st = cache.stats()
+    assert st['prefetched'] > 0 and st['prefetch_hits'] > 0
+    cached.search('event', 'UFC 2')
+    assert cache.stats()['hit_rate'] > st['hit_rate']
+    assert cached.stats()['block_cache']['hits'] == cache.stats()['hits']
+
+
+def test_budget_is_respected(tmp_path):
+    cache = BlockCache(block_size=4096, budget=3 * 4096)
+    cached, _ = _pair(tmp_path, cache)
+    cached.add_many([make_record(i) for i in range(400)])
+    assert len(list(cached.iterate())) == 400
+    st = cache.stats()
+    assert st['bytes'] <= 3 * 4096 and st['evictions'] > 0
+    cache.resize(4096)
+    assert cache.stats()['bytes'] <= 4096
+
+
+def test_own_writes_keep_cache_across_reopen(tmp_path):
+    cache = BlockCache(block_size=4096)
+    cached, _ = _pair(tmp_path, cache)
+    cached.add_many([make_record(i) for i in range(200)])
+    list(cached.iterate())
+    cached.close()  # rewrites the header
+    cached.open()
+    cached.backup(str(tmp_path / 'copy.bin'))  # closes and reopens
+    cache.reset_stats()
+    assert len(list(cached.iterate())) == 200
+    assert cache.stats()['misses'] == 0
+
+
+def test_external_change_is_seen_after_reopen(tmp_path):
+    cache = BlockCache(block_size=4096)
+    cached, _ = _pair(tmp_path, cache)
+    cached.add_many([make_record(i) for i in range(20)])
+    assert cached.get_by_id(4).event == 'UFC 0'
+    cached.close()
+    with open(cached.filepath, 'r+b') as f:
+        f.seek(cached.index[4] + 4)
+        f.write(b'2099-01-01')
+    os.utime(cached.filepath, ns=(0, 1))  # same size: only the mtime tells
+    cached.open()
+    assert cached.get_by_id(4).date == '2099-01-01'
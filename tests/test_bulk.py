@@ -0,0 +1,44 @@
+import pytest
+
+from conftest import make_record
+
+
+def test_update_where_dict_and_callable(any_db):
+    any_db.add_many([make_record(i) for i in range(30)])
+    assert any_db.update_where({'event': 'UFC 1'}, location='Rome') == 10
+    assert any_db.update_where(lambda r: r.id <= 5, card_type='Early Prelims') == 5
+    assert any_db.update_where({'event': 'nope'}, location='X') == 0
+    assert len(any_db.search('location', 'Rome')) == 10
+    assert [r.id for r in any_db.find_where({'card_type': 'Early Prelims'})] == [1, 2, 3, 4, 5]
+
+
+def test_update_where_is_all_or_nothing(any_db):
+    any_db.add_many([make_record(i) for i in range(4)])
+    before = [r.to_dict() for r in any_db.iterate()]
+    with pytest.raises(ValueError):
+        any_db.update_where(lambda r: True, fighter_1='A', fighter_2='B', winner='A', date='2024-02-02', fight_time='1:00')
+    with pytest.raises(ValueError):
+        any_db.update_where({'id': 2}, fight_time='bad')
+    assert [r.to_dict() for r in any_db.iterate()] == before
+
+
+def test_update_where_scans_once(db):
+    db.add_many([make_record(i) for i in range(10)])
+    scans = []
+    scan = db._scan
+
+    def counting():
+        scans.append(1)
+        return scan()
+    db._scan = counting
+    assert db.update_where(lambda r: r.id < 4, location='X') == 3
+    assert len(scans) == 1
+
+
+def test_delete_where_and_delete_by_field(any_db):
+    any_db.add_many([make_record(i) for i in range(30)])
+    assert any_db.delete_where({'event': 'UFC 0'}) == 10
+    assert any_db.delete_by_field('fighter_1', 'F15') == 1
+    assert any_db.delete_by_field('id', 'x') == 0
+    assert sorted(any_db.index) == list(range(1, 20))
+    assert any_db.verify()['problems'] == []
@@ -0,0 +1,95 @@
+import threading
+import time
+
+import pytest
+
+from conftest import make_record
+from database import Database, follow_changes, read_changes
+
+
+def test_subscribers_see_committed_changes(db):
+    events = []
+    db.subscribe(events.append)
+    db.add(make_record(1))
+    db.add(make_record(2))
+    db.edit(1, location='X')
+    db.delete_by_id(1)
+    assert [e['op'] for e in events] == ['add', 'add', 'edit', 'delete', 'renumber']
+    assert events[-1]['ids'] == [[2, 1]]
+    assert [e['seq'] for e in events] == [1, 2, 3, 4, 5]
+
+
+def test_change_log_resumes_from_seq(tmp_path):
+    path = str(tmp_path / 'c.bin')
+    d = Database(path, changelog=True)
+    d.create()
+    d.open()
+    for i in range(3):
+        d.add(make_record(i))
+    d.close()
+    d = Database(path, changelog=True)
+    d.open()
+    d.add(make_record(3))
+    assert [e['seq'] for e in d.changes()] == [1, 2, 3, 4]
+    assert [e['id'] for e in read_changes(d.changespath, since=2)] == [3, 4]
+    d.close()
+
+
+def test_follow_changes_reads_appended_events_only(tmp_path):
+    path = str(tmp_path / 'c.bin')
+    d = Database(path, changelog=True)
+    d.create()
+    d.open()
+    d.add(make_record(0))
+    got = []
+
+    def consume():
+        for e in follow_changes(d.changespath, since=0, poll_interval=0.01):
+            got.append(e['seq'])
+            if len(got) == 3:
+                break
+
+    t = threading.Thread(target=consume)
+    t.start()
+    time.sleep(0.05)
+    with open(d.changespath, 'a') as f:
+        f.write('{"seq": 2, "op": "x", ')  # half-written line
+    time.sleep(0.05)
+    with open(d.changespath, 'a') as f:
+        f.write('"ts": 0}\n')
+    d._seq = 2
+    d.add(make_record(1))
+    t.join(5)
+    assert got == [1, 2, 3]
+    d.close()
+
+
+def test_failing_listener_warns_and_fighter_index_recovers(db):
+    db.add(make_record(1))
+    index = db.fighters
+    apply = index._apply
+
+    def broken(event):
+        raise RuntimeError('boom')
+    index._apply = broken
+    with pytest.warns(RuntimeWarning):
+        db.add(make_record(2))
+    assert index.stale
+    index._apply = apply
+    assert [r.fighter_1 for r in db.fights_of('F2')] == ['F2']
+    assert not index.stale
+
+
+def test_seq_continues_after_reopening_a_one_event_log(tmp_path):
+    path = str(tmp_path / 'c.bin')
+    d = Database(path, changelog=True)
+    d.create()
+    d.open()
+    d.add(make_record(0))
+    d.close()
+    d = Database(path, changelog=True)
+    d.open()
+    d.add(make_record(1))
+    assert [e['seq'] for e in d.changes()] == [1, 2]
+    assert [e['id'] for e in read_changes(d.changespath, since=1)] == [2]
+    d.close()
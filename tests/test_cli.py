@@ -0,0 +1,65 @@
+import io
+import json
+import os
+import subprocess
+import sys
+
+import db_cli
+from conftest import make_record
+
+
+def _run(argv, capsys, stdin=None, monkeypatch=None):
+    if stdin is not None:
+        monkeypatch.setattr(sys, 'stdin', io.StringIO(stdin))
+    code = db_cli.main(argv)
+    out, err = capsys.readouterr()
+    return code, [json.loads(l) for l in out.splitlines() if l.strip()], err
+
+
+def test_create_add_query_export(tmp_path, capsys, monkeypatch):
+    path = str(tmp_path / 'c.bin')
+    assert _run(['create', path], capsys)[0] == 0
+    lines = ''.join(json.dumps(make_record(i).to_dict()) + '\n' for i in range(12))
+    code, out, _ = _run(['add', path], capsys, lines, monkeypatch)
+    assert code == 0 and out == [{'added': 12, 'errors': 0}]
+    code, out, _ = _run(['query', path, '--where', 'event=UFC 1', '--limit', '2'], capsys)
+    assert [r['id'] for r in out] == [11, 12]
+    code, out, _ = _run(['fighter', path, 'f3'], capsys)
+    assert out[0]['fights'] == 1
+    code, out, _ = _run(['export', path], capsys)
+    assert len(out) == 12
+    code, _, err = _run(['get', str(tmp_path / 'missing.bin'), '1'], capsys)
+    assert code == 1 and 'FileNotFoundError' in err
+
+
+def test_xlsx_export_requires_out(tmp_path, capsys):
+    path = str(tmp_path / 'c.bin')
+    _run(['create', path], capsys)
+    try:
+        db_cli.main(['export', path, '--format', 'xlsx'])
+    except SystemExit as e:
+        assert e.code == 2
+    else:
+        raise AssertionError('expected a usage error')
+
+
+def test_import_date_format_option(tmp_path, capsys):
+    path = str(tmp_path / 'c.bin')
+    src = tmp_path / 'in.csv'
+    src.write_text('Date,Event,Fighter1,Fighter2,Winner\n03/12/2024,E1,A,B,A\n')
+    _run(['create', path], capsys)
+    code, out, _ = _run(['import', path, str(src)], capsys)
+    assert out == [{'added': 0, 'errors': 1}]
+    code, out, _ = _run(['import', path, str(src), '--date-format', '%d/%m/%Y'], capsys)
+    assert code == 0 and out == [{'added': 1, 'errors': 0}]
+    code, out, _ = _run(['get', path, '1'], capsys)
+    assert out[0]['date'] == '2024-12-03'
+
+
+def test_python_m_database_uses_one_module(tmp_path):
+    path = str(tmp_path / 'c.bin')
+    root = os.path.dirname(os.path.abspath(db_cli.__file__))
+    subprocess.run([sys.executable, '-m', 'database', 'create', path], cwd=root, check=True, capture_output=True)
+    out = subprocess.run([sys.executable, '-m', 'database', 'stats', path], cwd=root, check=True,
+                         capture_output=True, text=True).stdout
+    assert json.loads(out)['records'] == 0
@@ -0,0 +1,76 @@
+import random
+
+from conftest import make_record
+from database import FIGHTER_FIELDS, Record, normalize_name
+
+
+def _brute_force(db, name):
+    key = normalize_name(name)
+    return [r.id for r in db.iterate() if key in (normalize_name(r.fighter_1), normalize_name(r.fighter_2))]
+
+
+def _brute_stats(db, name):
+    key = normalize_name(name)
+    st = {'fights': 0, 'wins': 0, 'losses': 0, 'no_result': 0}
+    for r in db.iterate():
+        if key in (normalize_name(r.fighter_1), normalize_name(r.fighter_2)):
+            st['fights'] += 1
+            w = normalize_name(r.winner)
+            st['no_result' if not w else 'wins' if w == key else 'losses'] += 1
+    return st
+
+
+def test_fighter_index_consistent_after_mixed_ops(any_db):
+    names = ['José Aldo', 'Jose Aldo', 'Conor McGregor', 'Max Holloway', 'Alex Volkanovski']
+    rng = random.Random(7)
+    any_db.add_many([make_record(i, fighter_1=names[i % 5], fighter_2=names[(i + 1) % 5], winner='')
+                     for i in range(40)])
+    any_db.fighters  # build, then keep it current through change events
+    for step in range(60):
+        op = rng.choice(['add', 'edit', 'delete', 'update'])
+        ids = sorted(any_db.index)
+        if op == 'add':
+            a, b = rng.sample(names, 2)
+            try:
+                any_db.add(make_record(1000 + step, fighter_1=a, fighter_2=b, winner=a))
+            except ValueError:
+                pass
+        elif op == 'edit' and ids:
+            r = any_db.get_by_id(rng.choice(ids))
+            try:
+                any_db.edit(r.id, winner=r.fighter_2)
+            except ValueError:
+                pass
+        elif op == 'delete' and ids:
+            any_db.delete_by_id(rng.choice(ids))
+        elif op == 'update':
+            try:
+                any_db.update_where({'fighter_1': rng.choice(names)}, location='L%d' % step)
+            except ValueError:
+                pass
+    for name in names + ['jose aldo', 'Nobody']:
+        assert [r.id for r in any_db.fights_of(name)] == _brute_force(any_db, name)
+        st = any_db.fighter_stats(name)
+        assert {k: st[k] for k in ('fights', 'wins', 'losses', 'no_result')} == _brute_stats(any_db, name)
+    assert any_db.verify()['problems'] == []
+
+
+def test_head_to_head(db):
+    db.add(make_record(1, fighter_1='A', fighter_2='B', winner='A'))
+    db.add(make_record(2, fighter_1='B', fighter_2='A', winner='B'))
+    db.add(make_record(3, fighter_1='A', fighter_2='C', winner='C'))
+    assert [r.id for r in db.head_to_head('a', 'b')] == [1, 2]
+    assert db.fighter_stats('A')['wins'] == 1 and db.fighter_stats('A')['losses'] == 2
+
+
+def test_blank_names_fall_back_to_scan(db):
+    for i, winner in enumerate(['', 'Draw', 'A']):
+        r = Record(i + 1, '2024-01-0%d' % (i + 1), '1:00', 'E', 'L', 'Main Card', 'Lightweight', 'A', 'B', winner)
+        db.index[r.id] = db._append(r)
+    db._save_index()
+    queries = [(f, v) for f in FIGHTER_FIELDS for v in ('', '  ', 'Draw', 'A', 'a')]
+    before = [len(db.search(f, v)) for f, v in queries]
+    db.fighters
+    assert [len(db.search(f, v)) for f, v in queries] == before
+    assert db.delete_where({'winner': ''}) == 1
+    assert db.delete_by_field('winner', 'Draw') == 1
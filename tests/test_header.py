@@ -0,0 +1,62 @@
+import os
+import shutil
+
+from conftest import make_record
+from database import HEADER_SIZE, Database, Record
+
+
+def _fill(path, n):
+    d = Database(path)
+    d.create()
+    d.open()
+    d.add_many([make_record(i) for i in range(n)])
+    d.close()
+
+
+def test_open_reads_only_the_header(tmp_path):
+    path = str(tmp_path / 'h.bin')
+    _fill(path, 50)
+    d = Database(path)
+    d.open()
+    assert d._index is None
+    assert d.count() == 50 and d._index is None
+    assert d.header['record_count'] == 50 and d.data_start == HEADER_SIZE
+    assert d.get_by_id(10).fighter_1 == 'F9'
+    d.close()
+
+
+def test_stale_header_rebuilds_index(tmp_path):
+    path = str(tmp_path / 'h.bin')
+    _fill(path, 20)
+    d = Database(path)
+    d.open()
+    # Crash between appending a record and saving the index.
+    d._append(Record(21, '2024-02-01', '1:00', 'X', 'Y', 'Main Card', 'Lightweight', 'A', 'B', 'A'))
+    d.file.close()
+    d.file = None
+    d = Database(path)
+    d.open()
+    assert len(d.index) == 21 and d.get_by_id(21).event == 'X'
+    d.close()
+
+
+def test_corrupt_index_file_is_rebuilt(tmp_path):
+    path = str(tmp_path / 'h.bin')
+    _fill(path, 20)
+    with open(path + '.idx', 'wb') as f:
+        f.write(b'not a pickle')
+    d = Database(path)
+    d.open()
+    assert d.get_by_id(20).fighter_1 == 'F19'
+    d.close()
+
+
+def test_legacy_headerless_file(tmp_path):
+    legacy = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ufc_db.bin')
+    path = str(tmp_path / 'legacy.bin')
+    shutil.copy(legacy, path)
+    d = Database(path)
+    d.open()
+    assert d.header is None and d.data_start == 0
+    assert d.count() == len(list(d.iterate()))
+    d.close()
@@ -0,0 +1,76 @@
+import pytest
+
+from database import Database, _parse_date_text, DATE_FORMATS
+
+HEADER = 'Date,Time,Event,Venue,Card,Division,Fighter1,Fighter2,Winner\n'
+
+
+def _csv(tmp_path, rows):
+    path = tmp_path / 'in.csv'
+    path.write_text(HEADER + ''.join(r + '\n' for r in rows))
+    return str(path)
+
+
+def test_import_csv_maps_aliases_and_normalizes(tmp_path, db):
+    path = _csv(tmp_path, ['2024/05/06,305,E1,L,Main Card,Lightweight,A,B,A',
+                           '6 May 2024,4:05,E2,L,Main Card,Lightweight,C,D,',
+                           '2024-05-06,4:65,E3,L,Main Card,Lightweight,E,F,E'])
+    errors = []
+    assert db.import_csv(path, errors=errors) == 2
+    assert [(r.date, r.fight_time) for r in db.iterate()] == [('2024-05-06', '05:05'), ('2024-05-06', '04:05')]
+    assert [e['row'] for e in errors] == [2]
+
+
+def test_day_month_order_is_inferred_per_file(tmp_path, db):
+    path = _csv(tmp_path, ['03/12/2024,5:00,E1,L,Main Card,Lightweight,A,B,A',
+                           '13/03/2024,5:00,E2,L,Main Card,Lightweight,A,B,A'])
+    errors = []
+    assert db.import_csv(path, errors=errors) == 2
+    assert errors == []
+    assert [r.date for r in db.iterate()] == ['2024-12-03', '2024-03-13']
+
+
+def test_month_first_order_is_inferred_per_file(tmp_path, db):
+    path = _csv(tmp_path, ['03/12/2024,5:00,E1,L,Main Card,Lightweight,A,B,A',
+                           '03/13/2024,5:00,E2,L,Main Card,Lightweight,A,B,A'])
+    errors = []
+    assert db.import_csv(path, errors=errors) == 2
+    assert [r.date for r in db.iterate()] == ['2024-03-12', '2024-03-13']
+
+
+def test_unsettled_slash_dates_are_rejected(tmp_path, db):
+    path = _csv(tmp_path, ['03/12/2024,5:00,E1,L,Main Card,Lightweight,A,B,A',
+                           '05/05/2024,5:00,E2,L,Main Card,Lightweight,A,B,A',
+                           '2024-03-13,5:00,E3,L,Main Card,Lightweight,A,B,A'])
+    errors = []
+    assert db.import_csv(path, errors=errors) == 2
+    assert [e['row'] for e in errors] == [0]
+    assert 'ambiguous' in errors[0]['reason']
+    assert [r.date for r in db.iterate()] == ['2024-05-05', '2024-03-13']
+
+
+def test_explicit_date_formats_accept_a_list(tmp_path, db):
+    path = _csv(tmp_path, ['03/12/2024,5:00,E1,L,Main Card,Lightweight,A,B,A',
+                           '03/13/2024,5:00,E2,L,Main Card,Lightweight,A,B,A'])
+    errors = []
+    assert db.import_csv(path, errors=errors, date_formats=['%m/%d/%Y']) == 2
+    assert errors == []
+    assert [r.date for r in db.iterate()] == ['2024-03-12', '2024-03-13']
+
+
+def test_parse_date_text_unambiguous_forms():
+    assert _parse_date_text('2024-01-02', DATE_FORMATS) == '2024-01-02'
+    assert _parse_date_text('2024-01-02T10:00:00', DATE_FORMATS) == '2024-01-02'
+    assert _parse_date_text('Jan 2, 2024', DATE_FORMATS) == '2024-01-02'
+    with pytest.raises(ValueError):
+        _parse_date_text('01/02/2024', DATE_FORMATS)
+
+
+def test_import_excel_needs_pandas(tmp_path, db):
+    try:
+        import pandas  # noqa: F401
+    except ImportError:
+        with pytest.raises(RuntimeError):
+            db.import_excel(str(tmp_path / 'missing.xlsx'))
+    else:
+        pytest.skip('pandas is installed')
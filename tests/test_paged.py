@@ -0,0 +1,159 @@
+import os
+
+import pytest
+
+from conftest import dump, make_record
+from database import PAGE_FLAGS_POS, Database, PagedDatabase, database_class, open_database
+
+
+def _ops(db):
+    db.add_many([make_record(i) for i in range(300)])
+    db.edit(10, location='Paris')
+    db.delete_by_id(3)
+    db.update_where({'event': 'UFC 5'}, location='Rome')
+    db.add(make_record(1000))
+
+
+def test_paged_and_plain_round_trip_match(tmp_path):
+    plain = Database(str(tmp_path / 'plain.bin'))
+    paged = PagedDatabase(str(tmp_path / 'paged.bin'), page_records=16)
+    for d in (plain, paged):
+        d.create()
+        d.open()
+        _ops(d)
+        d.close()
+    plain, paged = open_database(plain.filepath), open_database(paged.filepath)
+    assert isinstance(paged, PagedDatabase) and type(plain) is Database
+    assert dump(paged.iterate()) == dump(plain.iterate())
+    assert paged.count() == plain.count() == 300
+    assert paged.verify()['problems'] == []
+    plain.close()
+    paged.close()
+
+
+def test_plain_database_refuses_paged_file(tmp_path):
+    path = str(tmp_path / 'p.bin')
+    p = PagedDatabase(path)
+    p.create()
+    p.open()
+    p.add(make_record(1))
+    p.close()
+    with pytest.raises(ValueError):
+        Database(path).open()
+    assert database_class(path) is PagedDatabase
+    assert database_class(str(tmp_path / 'missing.bin')) is Database
+
+
+def test_paged_edit_survives_without_close(tmp_path):
+    path = str(tmp_path / 'p.bin')
+    p = PagedDatabase(path)
+    p.create()
+    p.open()
+    p.add_many([make_record(i) for i in range(100)])
+    p.close()
+    p = PagedDatabase(path)
+    p.open()
+    p.edit(1, event='CHANGED')
+    p.file.close()  # simulated crash: no close(), nothing else flushed
+    p = PagedDatabase(path)
+    p.open()
+    assert p.get_by_id(1).event == 'CHANGED'
+    p.close()
+
+
+def test_stale_page_directory_is_rebuilt(tmp_path):
+    path = str(tmp_path / 'p.bin')
+    p = PagedDatabase(path, page_records=8, cache_pages=1)
+    p.create()
+    p.open()
+    p.add_many([make_record(i) for i in range(64)])
+    p.close()
+    p = PagedDatabase(path, page_records=8, cache_pages=1)
+    p.open()
+    # Longer records no longer fit their page slots, so pages move to the end
+    # of the file while the saved directory still points at the old slots.
+    for i in range(1, 65):
+        r = make_record(i - 1, event='A much longer event name %d' % i, location='Somewhere else')
+        r.id = i
+        p._write_at(p.index[i], r)
+    p._flush_pages()
+    p.file.close()
+    p = PagedDatabase(path)
+    p.open()
+    assert p.get_by_id(40).event == 'A much longer event name 40'
+    assert p.count() == 64
+    p.close()
+
+
+def test_crash_before_freeing_old_page_copy_keeps_new_copy(tmp_path):
+    path = str(tmp_path / 'p.bin')
+    p = PagedDatabase(path, page_records=8)
+    p.create()
+    p.open()
+    p.add_many([make_record(i) for i in range(16)])
+    p.close()
+    p = PagedDatabase(path, page_records=8)
+    p.open()
+    old_flags = p.pages[0][0] + PAGE_FLAGS_POS
+    f = p.file
+
+    class Crashing:
+        # Dies on the write that frees the old copy of page 0.
+        def __getattr__(self, name):
+            return getattr(f, name)
+
+        def write(self, data):
+            if f.tell() == old_flags:
+                raise OSError('simulated crash')
+            return f.write(data)
+    p.file = Crashing()
+    r = make_record(0, event='A much longer event name', location='Somewhere else')
+    r.id = 1
+    with pytest.raises(OSError):
+        p._write_at(p.index[1], r)
+        p._flush_pages()
+    f.close()
+    p = PagedDatabase(path)
+    p.open()
+    assert p.get_by_id(1).event == 'A much longer event name'
+    assert p.count() == 16
+    p.close()
+
+
+def test_damaged_page_directory_is_rebuilt(tmp_path):
+    path = str(tmp_path / 'p.bin')
+    p = PagedDatabase(path)
+    p.create()
+    p.open()
+    p.add_many([make_record(i) for i in range(50)])
+    p.close()
+    with open(path + '.pdir', 'r+b') as f:
+        f.write(b'garbage!')
+    p = PagedDatabase(path)
+    p.open()
+    assert p.count() == 50 and p.get_by_id(50).fighter_1 == 'F49'
+    p.close()
+
+
+def test_corrupt_page_is_reported_and_repaired(tmp_path):
+    path = str(tmp_path / 'p.bin')
+    p = PagedDatabase(path, page_records=8)
+    p.create()
+    p.open()
+    p.add_many([make_record(i) for i in range(40)])
+    p.close()
+    p = PagedDatabase(path)
+    p.open()
+    pos, _, comp_len, _ = p.pages[1]
+    p.file.close()
+    with open(path, 'r+b') as f:
+        f.seek(pos + comp_len)
+        f.write(b'\xff\xff\xff\xff')
+    p = PagedDatabase(path)
+    p.open()
+    assert p.verify_pages() == [1]
+    p.repair()
+    assert p.verify_pages() == []
+    assert p.count() == 32
+    p.close()
+    assert os.path.exists(path + '.pdir')
@@ -0,0 +1,58 @@
+import pytest
+
+from conftest import make_record
+from partitioned import PartitionedDatabase
+
+
+@pytest.fixture
+def pdb(tmp_path):
+    p = PartitionedDatabase(str(tmp_path / 'parts'))
+    p.create()
+    yield p
+    p.close()
+
+
+def test_global_ids_are_stable_across_inserts(pdb):
+    gid = pdb.add(make_record(1, date='2025-01-01'))
+    pdb.add(make_record(2, date='2020-01-01'))
+    pdb.add(make_record(3, date='2022-06-01'))
+    assert pdb.get_by_id(gid).date == '2025-01-01'
+    assert sorted(r.id for r in pdb.iterate()) == sorted([gid] + [r.id for r in pdb.search_range('date', '2020', '2023')])
+
+
+def test_delete_renumbers_only_its_partition(pdb):
+    a = [pdb.add(make_record(i, date='2021-01-%02d' % (i + 1))) for i in range(3)]
+    b = pdb.add(make_record(10, date='2024-01-01'))
+    pdb.delete_by_id(a[0])
+    assert pdb.get_by_id(b).fighter_1 == 'F10'
+    assert pdb.get_by_id(a[0]).fighter_1 == 'F1'
+    assert pdb.count() == 3
+
+
+def test_edit_moves_record_between_partitions(pdb):
+    gid = pdb.add(make_record(1, date='2020-01-01'))
+    keep = pdb.add(make_record(2, date='2023-01-01'))
+    moved = pdb.edit(gid, date='2023-05-05')
+    assert moved.date == '2023-05-05'
+    assert pdb.partitions() == ['2023']
+    assert pdb.get_by_id(keep).fighter_1 == 'F2'
+    assert pdb.get_by_id(moved.id).fighter_1 == 'F1'
+
+
+def test_search_prunes_and_tolerates_foreign_types(pdb):
+    for i in range(6):
+        pdb.add(make_record(i, date='%d-01-01' % (2019 + i)))
+    assert [r.fighter_1 for r in pdb.search('fighter_1', 'F3')] == ['F3']
+    assert pdb.search('fighter_1', 5) == []
+    assert pdb.search_range('date', 1, 2) == []
+    assert len(pdb.search_range('date', '2020-01-01', '2021-12-31')) == 2
+
+
+def test_manifest_round_trip(tmp_path, pdb):
+    gid = pdb.add(make_record(1, date='2021-01-01'))
+    pdb.close()
+    again = PartitionedDatabase(str(tmp_path / 'parts'))
+    again.open()
+    assert again.get_by_id(gid).fighter_1 == 'F1'
+    with pytest.raises(ValueError):
+        PartitionedDatabase(str(tmp_path / 'parts'), partition_by='event').open()
@@ -0,0 +1,80 @@
+import threading
+
+import pytest
+
+from conftest import make_record
+from db_server import ClientPool, DatabaseOps, DatabaseServer
+
+
+@pytest.fixture
+def server(db):
+    srv = DatabaseServer(db, ('127.0.0.1', 0))
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture
+def pool(server):
+    p = ClientPool(port=server.server_address[1], size=2)
+    yield p
+    p.close()
+
+
+def test_pipelined_calls_and_batch(pool):
+    with pool.connection() as c:
+        assert c.ping() == 'pong'
+        res = c.call_many([('add', {'record': make_record(i).to_dict()}) for i in range(20)])
+        assert [r['result'] for r in res] == list(range(1, 21))
+        assert [r and r.fighter_1 for r in c.get_many([1, 2, 999])] == ['F0', 'F1', None]
+        out = c.batch([('get', {'id': 3}), ('nope', {})])
+        assert out[0]['ok'] and out[0]['result']['fighter_1'] == 'F2'
+        assert not out[1]['ok'] and out[1]['error'] == 'ValueError'
+        with pytest.raises(ValueError):
+            c.edit(1, fight_time='bad')
+        assert c.count() == 20
+
+
+def test_interrupted_client_is_not_reused(pool):
+    with pool.connection() as c:
+        c.add(make_record(1))
+
+    def interrupted():
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        with pool.connection() as c:
+            c._read = interrupted
+            c.count()
+    assert c.pending == 1
+    with pool.connection() as c2:
+        assert c2 is not c
+        assert c2.count() == 1
+
+
+def test_remote_error_keeps_connection(pool):
+    with pytest.raises(ValueError):
+        with pool.connection() as c:
+            c.get_by_id('not a number')
+    with pool.connection() as c2:
+        assert c2 is c and c2.ping() == 'pong'
+
+
+def test_mismatched_response_id_is_rejected(pool):
+    with pool.connection() as c:
+        original = c._encode
+
+        def stale_id(op, args):
+            rid, line = original(op, args)
+            return rid + 1, line
+        c._encode = stale_id
+        with pytest.raises(ConnectionError):
+            c.ping()
+
+
+def test_ops_handle_line_errors(db):
+    ops = DatabaseOps(db)
+    assert ops.handle_line('not json')['error'] == 'ValueError'
+    assert ops.handle_line('{"id": 7, "op": "get", "args": {"id": 1}}') == {'id': 7, 'ok': True, 'result': None}
+    assert ops.handle_line('{"id": 8, "op": "nope"}')['ok'] is False
@@ -0,0 +1,39 @@
+import pytest
+
+from conftest import make_record
+
+
+def test_snapshot_is_stable_across_deletes_and_renumbering(any_db):
+    any_db.add_many([make_record(i) for i in range(200)])
+    expected = [(i + 1, 'F%d' % i) for i in range(200)]
+    with any_db.snapshot() as snap:
+        seen = []
+        for j, r in enumerate(snap.iterate()):
+            seen.append((r.id, r.fighter_1))
+            if j == 10:
+                any_db.delete_by_id(3)  # renumbers every later id
+                any_db.edit(100, location='Z')
+                any_db.add(make_record(1000))
+        assert seen == expected
+        assert snap.get_by_id(3).fighter_1 == 'F2'
+        assert snap.get_by_id(100).location == 'Las Vegas'
+        assert snap.count() == 200
+        assert any_db.get_by_id(3).fighter_1 == 'F3'
+        assert (any_db.get_by_id(100).fighter_1, any_db.get_by_id(100).location) == ('F100', 'Z')
+
+
+def test_snapshot_search_ignores_later_writes(any_db):
+    any_db.add_many([make_record(i) for i in range(20)])
+    snap = any_db.snapshot()
+    any_db.update_where({'event': 'UFC 1'}, location='Rome')
+    assert len(snap.search('location', 'Las Vegas')) == 20
+    assert len(any_db.search('location', 'Rome')) == 10
+    snap.close()
+
+
+def test_snapshot_invalidated_by_clear(any_db):
+    any_db.add(make_record(1))
+    snap = any_db.snapshot()
+    any_db.clear()
+    with pytest.raises(RuntimeError):
+        list(snap.iterate())
@@ -0,0 +1,40 @@
+import json
+
+from conftest import make_record
+from database import Record, record_errors, validate_records
+
+
+def test_record_errors_lists_every_rule():
+    rec = make_record(1, fight_time='9:99', fighter_1='123', winner='Z', card_type='Nope')
+    fields = sorted(f for f, _ in record_errors(rec))
+    assert fields == ['card_type', 'fight_time', 'fighter_1', 'winner']
+    assert record_errors(make_record(1)) == []
+
+
+def test_validate_records_reports_rows_in_order():
+    recs = [make_record(i) for i in range(5)]
+    recs[2].fight_time = 'bad'
+    recs[4].weight_class = 'Nope'
+    report = validate_records(recs)
+    assert [(e['row'], e['field']) for e in report] == [(2, 'fight_time'), (4, 'weight_class')]
+    assert validate_records(recs, workers=2, chunk_size=2) == report
+
+
+def test_import_json_skips_bad_rows(tmp_path, db):
+    items = [make_record(i).to_dict() for i in range(6)]
+    items[1]['winner'] = 'Nobody'
+    items[3] = 'junk'
+    items[5] = dict(items[4])
+    path = tmp_path / 'in.json'
+    path.write_text(json.dumps(items))
+    errors = []
+    assert db.import_json(str(path), errors=errors) == 3
+    assert [e['row'] for e in errors] == [1, 3, 5]
+
+
+def test_add_many_reports_invalid_rows(db):
+    errors = []
+    batch = [make_record(0), make_record(1, fight_time='x'), make_record(0)]
+    assert db.add_many(batch, errors) == 1
+    assert [e['row'] for e in errors] == [1, 2]
+    assert isinstance(db.get_by_id(1), Record)
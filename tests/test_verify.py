@@ -0,0 +1,80 @@
+import os
+import shutil
+
+import pytest
+
+import db_check
+from conftest import make_record
+from database import Database, PagedDatabase, RECORD_SIZE
+
+
+def test_clean_database_verifies(any_db):
+    any_db.add_many([make_record(i) for i in range(20)])
+    report = any_db.verify()
+    assert report == {'records': 20, 'active': 20, 'problems': []}
+
+
+def test_repair_fixes_trailing_bytes_and_bad_utf8(db):
+    db.add_many([make_record(i) for i in range(20)])
+    offset = db.index[5]
+    db.file.seek(offset + 4)
+    db.file.write(b'\xff\xfe')
+    db.file.seek(0, os.SEEK_END)
+    db.file.write(b'\x01' * 10)
+    db.file.flush()
+    kinds = sorted(p['kind'] for p in db.verify()['problems'])
+    assert 'bad_utf8' in kinds and 'trailing_bytes' in kinds
+    assert db.repair()['problems'] == []
+    assert os.path.getsize(db.filepath) == db.data_start + 20 * RECORD_SIZE
+
+
+def test_repair_refuses_foreign_file(tmp_path, db):
+    db.close()
+    with open(db.filepath, 'wb') as f:
+        f.write(os.urandom(RECORD_SIZE * 40))
+    db.open()
+    with pytest.raises(ValueError):
+        db.repair()
+
+
+def test_db_check_detects_paged_files(tmp_path, capsys):
+    path = str(tmp_path / 'p.bin')
+    p = PagedDatabase(path)
+    p.create()
+    p.open()
+    p.add_many([make_record(i) for i in range(300)])
+    p.close()
+    assert db_check.main([path, '--repair']) == 0
+    p = PagedDatabase(path)
+    p.open()
+    assert p.count() == 300 and p.get_by_id(300).fighter_1 == 'F299'
+    p.close()
+    assert db_check.main([str(tmp_path / 'missing.bin')]) == 2
+    capsys.readouterr()
+
+
+def test_repair_refuses_shipped_legacy_file(tmp_path):
+    legacy = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ufc_db.bin')
+    path = str(tmp_path / 'legacy.bin')
+    shutil.copy(legacy, path)
+    with open(path, 'rb') as f:
+        before = f.read()
+    d = Database(path)
+    d.open()
+    with pytest.raises(ValueError):
+        d.repair()
+    d.file.close()
+    with open(path, 'rb') as f:
+        assert f.read() == before
+
+
+def test_bad_active_flag_is_repaired_as_deleted(db):
+    db.add_many([make_record(i) for i in range(10)])
+    offset = db.index[4]
+    db.file.seek(offset + RECORD_SIZE - 1)
+    db.file.write(b'\x61')
+    db.file.flush()
+    assert 'bad_active_flag' in [p['kind'] for p in db.verify()['problems']]
+    assert db.repair()['problems'] == []
+    assert db.count() == 9
+    assert 'F3' not in [r.fighter_1 for r in db.iterate()]
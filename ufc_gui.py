@@ -1,7 +1,7 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import os
-from database import Database, Record, CARD_TYPES, WEIGHT_CLASSES
+from database import Database, Record, CARD_TYPES, WEIGHT_CLASSES, database_class
 
 DEFAULT_DB = 'ufc_db.bin'
 
@@ -78,7 +78,7 @@ class App(tk.Tk):
             except Exception:
                 pass
             self.current_db_file = DEFAULT_DB
-            self.db = Database(self.current_db_file)
+            self.db = database_class(self.current_db_file)(self.current_db_file)
             try:
                 self.db.open()
             except Exception:
@@ -91,7 +91,7 @@ class App(tk.Tk):
                 self.destroy()
                 return
             self.current_db_file = dlg.selected
-            self.db = Database(self.current_db_file)
+            self.db = database_class(self.current_db_file)(self.current_db_file)
             try:
                 self.db.open()
             except Exception:
@@ -454,7 +454,7 @@ class App(tk.Tk):
                 pass
             return
         self.current_db_file = dlg.selected
-        self.db = Database(self.current_db_file)
+        self.db = database_class(self.current_db_file)(self.current_db_file)
         try:
             self.db.open()
         except: